@@ -2,12 +2,20 @@
 Main entry point for the duplicate image finder application.
 """
 import sys
+import threading
 import traceback
 import logging
 import argparse
 from pathlib import Path
 from .controllers.gui_controller import DuplicateFinderController
+from .controllers.query_server import QueryServer
 from .models.image_finder import ImageFinder
+from .models.folder_watcher import FolderWatcher
+from .models.io_scheduler import IOScheduler, benchmark_io
+from .models.memory_budget import MemoryBudget
+from .models.keep_policy import KeepPolicy
+from .models.group_verifier import GroupVerifier
+from .models.throttle import ScanThrottle
 
 # Configure logging
 logging.basicConfig(
@@ -20,13 +28,152 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def watch_folder(finder: ImageFinder, folder_path: Path):
+    """Watch a folder and print duplicate events until interrupted."""
+    def on_duplicate(path, group):
+        print(f"\nDuplicate detected (Hash: {group.hash_value[:8]}): {path}")
+        for other in group.paths:
+            if other != path:
+                print(f"  matches {other}")
+
+    watcher = FolderWatcher(finder, folder_path, on_duplicate=on_duplicate)
+    print(f"\nWatching {folder_path} for changes (Ctrl+C to stop)...")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+        print("\nStopped watching.")
+
+def serve_folder(finder: ImageFinder, folder_path: Path, args: argparse.Namespace):
+    """Index a folder and serve lookups until interrupted."""
+    server = QueryServer(finder, host=args.host, port=args.port, socket_path=args.socket)
+    print(f"Indexing folder: {folder_path}")
+    server.load(folder_path)
+    print(f"Indexed {server.stats()['images']} images")
+    server.start()
+    print(f"Serving lookups on {server.address} (Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+def confirm_delete(duplicates) -> bool:
+    """Ask on stdin before deleting the non-kept copies of each group."""
+    count = sum(len(group.paths) - 1 for group in duplicates)
+    try:
+        answer = input(f"\nDelete {count} duplicate files? [y/N] ")
+    except EOFError:
+        return False
+    return answer.strip().lower() in ('y', 'yes')
+
+def positive_int(value: str) -> int:
+    """Argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def positive_float(value: str) -> float:
+    """Argparse type for limits that must be greater than zero."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+def control_throttle(throttle: ScanThrottle):
+    """Read throttle commands from stdin so limits can change mid-scan."""
+    def parse(value: str):
+        if value in ('off', '0'):
+            return None
+        limit = float(value)
+        if not limit > 0:
+            raise ValueError(value)
+        return limit
+
+    for line in sys.stdin:
+        parts = line.split()
+        try:
+            if len(parts) == 2 and parts[0] == 'rate':
+                rate = parse(parts[1])
+                throttle.set_limits(rate * 1024 * 1024 if rate else None, throttle.files_per_second)
+            elif len(parts) == 2 and parts[0] == 'files':
+                throttle.set_limits(throttle.bytes_per_second, parse(parts[1]))
+            elif parts != ['status']:
+                print("Commands: rate <MB/s|off>, files <files/s|off>, status")
+                continue
+        except ValueError:
+            print(f"Invalid value: {parts[1]}")
+            continue
+        bps, fps = throttle.throughput()
+        limit_mb = f"{throttle.bytes_per_second / (1024 * 1024):.1f} MB/s" if throttle.bytes_per_second else "unlimited"
+        limit_files = f"{throttle.files_per_second:.1f} files/s" if throttle.files_per_second else "unlimited"
+        print(f"Throughput {bps / (1024 * 1024):.1f} MB/s, {fps:.1f} files/s "
+              f"(limits: {limit_mb}, {limit_files})")
+
 def main():
     """Main entry point."""
     try:
         parser = argparse.ArgumentParser(description='Find and manage duplicate images.')
         parser.add_argument('--gui', action='store_true', help='Start the GUI application')
         parser.add_argument('--folder', type=str, help='Folder to scan for duplicates')
+        parser.add_argument('--watch', action='store_true',
+                            help='Keep watching the folder and report new duplicates as they appear')
+        parser.add_argument('--match', choices=ImageFinder.MATCH_KEYS, default='average_hash',
+                            help='Signature used to group duplicates (pixel_digest finds exact pixel copies)')
+        parser.add_argument('--group-by', choices=ImageFinder.MATCH_KEYS, action='append', default=[],
+                            metavar='KEY', help='Also report groups by this signature, from the same decode (repeatable)')
+        parser.add_argument('--io-schedule', action='store_true',
+                            help='Read files in on-disk order with read-ahead (helps HDDs and NAS)')
+        parser.add_argument('--benchmark-io', action='store_true',
+                            help='Compare cold-cache throughput with and without --io-schedule')
+        parser.add_argument('--readers', type=positive_int, help='Reader threads for parallel scanning')
+        parser.add_argument('--decoders', type=positive_int, help='Decoder threads for parallel scanning')
+        parser.add_argument('--autotune', action='store_true',
+                            help='Adjust reader/decoder threads at runtime to maximise files/sec')
+        parser.add_argument('--memory-budget', type=positive_int, metavar='MB',
+                            help='Memory shared by all decoders; large images are reduced or decoded alone')
+        parser.add_argument('--max-image-mb', type=positive_int, metavar='MB',
+                            help='Skip images whose estimated decode size exceeds this')
+        parser.add_argument('--keep', type=str, default='first',
+                            help=f"Comma separated criteria for the copy to keep: {', '.join(KeepPolicy.CRITERIA)}")
+        parser.add_argument('--prefer-prefix', action='append', default=[], metavar='PATH',
+                            help='Prefer keeping copies under this path (with --keep prefix, repeatable)')
+        parser.add_argument('--prefer-format', type=str, metavar='FORMATS',
+                            help='Format preference for --keep format, e.g. heif,png,jpeg')
+        parser.add_argument('--delete', action='store_true',
+                            help='Delete every duplicate except the copy chosen by --keep '
+                                 '(requires --verify or --match pixel_digest)')
+        parser.add_argument('--yes', action='store_true', help='Do not ask before deleting with --delete')
+        parser.add_argument('--verify', action='store_true',
+                            help='Confirm hash matches with a 64x64 pixel comparison before reporting')
+        parser.add_argument('--verify-threshold', type=float, default=GroupVerifier.THRESHOLD,
+                            help=f"Max mean absolute pixel difference (0-1) for --verify (default: {GroupVerifier.THRESHOLD})")
+        parser.add_argument('--background', action='store_true',
+                            help='Scan at low CPU/I/O priority; type "rate N", "files N" or "status" while scanning')
+        parser.add_argument('--max-read-mbps', type=positive_float, metavar='MB/S', help='Cap read bandwidth')
+        parser.add_argument('--max-files-per-sec', type=positive_float,
+                            help='Cap the number of files read per second')
+        parser.add_argument('--archives', action='store_true',
+                            help='Also look inside zip/tar archives without extracting them')
+        parser.add_argument('--archive-cache', type=str, metavar='DIR',
+                            help='Where to cache archive member indexes (default: ~/.cache/delete_duplicate_images/archives)')
+        parser.add_argument('--serve', action='store_true',
+                            help='Index the folder once and answer lookups over HTTP')
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Host for --serve (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Port for --serve (default: 8765)')
+        parser.add_argument('--socket', type=str, help='Serve on this Unix socket instead of a TCP port')
         args = parser.parse_args()
+        if args.delete and not (args.verify or args.match == 'pixel_digest'):
+            # Perceptual hashes alone group images that merely look alike
+            parser.error("--delete requires --verify or --match pixel_digest")
+        if args.delete and args.background and not args.yes:
+            parser.error("--delete with --background requires --yes, stdin is used for throttle commands")
 
         if args.gui:
             # Start GUI application
@@ -38,30 +185,107 @@ def main():
             # CLI mode
             logger.info("Initializing image finder...")
             finder = ImageFinder()
+            finder.set_match_key(args.match)
+            finder.collect_signatures = bool(args.group_by)
+            finder.set_workers(args.readers, args.decoders, args.autotune)
+            finder.keep_policy = KeepPolicy.from_spec(
+                args.keep, args.prefer_prefix,
+                args.prefer_format.split(',') if args.prefer_format else None)
+            if args.background or args.max_read_mbps or args.max_files_per_sec:
+                finder.throttle = ScanThrottle(
+                    args.max_read_mbps * 1024 * 1024 if args.max_read_mbps else None,
+                    args.max_files_per_sec, low_priority=args.background)
+                if args.background:
+                    threading.Thread(target=control_throttle, args=(finder.throttle,), daemon=True).start()
+            if args.archives:
+                if args.archive_cache:
+                    finder.enable_archives(Path(args.archive_cache))
+                else:
+                    finder.enable_archives()
+            if args.verify:
+                finder.verifier = GroupVerifier(threshold=args.verify_threshold)
+            if args.memory_budget or args.max_image_mb:
+                finder.memory_budget = MemoryBudget(
+                    args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+                    max_image_bytes=args.max_image_mb * 1024 * 1024 if args.max_image_mb else None)
+            if args.io_schedule:
+                finder.io_scheduler = IOScheduler()
             folder_path = Path(args.folder)
             
             if not folder_path.exists():
                 logger.error(f"Error: Folder '{args.folder}' does not exist")
                 return
             
+            if args.benchmark_io:
+                print(f"Benchmarking I/O on: {folder_path}")
+                results = benchmark_io(finder, folder_path)
+                print(f"  rglob order: {results['baseline_mb_per_second']:.1f} MB/s")
+                print(f"  scheduled:   {results['scheduled_mb_per_second']:.1f} MB/s")
+                print(f"  gain:        {results['gain_percent']:+.1f}%")
+                return
+
+            if args.serve:
+                serve_folder(finder, folder_path, args)
+                return
+
             print(f"Scanning folder: {folder_path}")
             duplicates = finder.find_duplicates(str(folder_path))
+            stats = finder.scan_stats
+            print(f"Scanned {stats.files} files in {stats.elapsed:.1f}s "
+                  f"({stats.files_per_second:.1f} files/s, {stats.mb_per_second:.1f} MB/s)")
+            if finder._is_parallel():
+                tuned = " (autotuned, pin with --readers/--decoders)" if stats.autotuned else ""
+                print(f"Workers: {stats.readers} readers, {stats.decoders} decoders{tuned}")
+            if finder.verifier:
+                vstats = finder.verifier.stats
+                print(f"Verified {vstats.groups_checked} candidate groups ({vstats.images_checked} images, "
+                      f"{vstats.images_per_second:.1f} images/s): {vstats.groups_split} split, "
+                      f"{vstats.images_rejected} images rejected")
             
+            if finder.degraded_images:
+                print(f"\nHashed {len(finder.degraded_images)} large images at reduced resolution:")
+                for path in finder.degraded_images:
+                    print(f"  {path}")
+            if finder.skipped_images:
+                print(f"\nSkipped {len(finder.skipped_images)} images over the memory limit:")
+                for path in finder.skipped_images:
+                    print(f"  {path}")
+
             if finder.errors:
                 print("\nWarnings:")
                 for error in finder.errors:
                     print(f"  {error}")
             
-            if not duplicates:
-                print("\nNo duplicates found!")
-                return
-            
-            print(f"\nFound {len(duplicates)} groups of duplicates:")
-            for group in duplicates:
-                if group and group.hash_value:  # Add null check
-                    print(f"\nDuplicate Group (Hash: {group.hash_value[:8]}):")
+            for key in args.group_by:
+                # Regrouped from signatures kept during the scan, no file is read again
+                regrouped = finder.group_by(key)
+                print(f"\nFound {len(regrouped)} groups by {key}:")
+                for group in regrouped:
+                    print(f"\nGroup ({key}: {group.hash_value[:8]}):")
                     for path in group.paths:
                         print(f"  {path}")
+
+            if not duplicates:
+                print("\nNo duplicates found!")
+            else:
+                print(f"\nFound {len(duplicates)} groups of duplicates:")
+                for group in duplicates:
+                    if group and group.hash_value:  # Add null check
+                        print(f"\nDuplicate Group (Hash: {group.hash_value[:8]}):")
+                        keeper = finder.choose_keeper(group)
+                        for path in group.paths:
+                            marker = "keep" if path == keeper else "    "
+                            print(f"  {marker} {path}")
+
+                if args.delete:
+                    if args.yes or confirm_delete(duplicates):
+                        deleted = finder.delete_duplicates(duplicates)
+                        print(f"\nDeleted {len(deleted)} duplicate files.")
+                    else:
+                        print("\nNothing deleted.")
+
+            if args.watch:
+                watch_folder(finder, folder_path)
         else:
             parser.print_help()
 
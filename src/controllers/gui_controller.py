@@ -4,13 +4,18 @@ Controller for the GUI application.
 import threading
 from typing import List, Optional
 from ..models.image_finder import ImageFinder, ImageGroup
+from ..models.throttle import ScanThrottle
 from ..views.gui_view import DuplicateFinderView
 
 class DuplicateFinderController:
     """Controller that coordinates between the ImageFinder model and GUI view."""
     
+    THROUGHPUT_REFRESH_MS = 1000
+    
     def __init__(self):
         self.model = ImageFinder()
+        # Always installed so limits can change mid-scan; unlimited until background mode is on
+        self.model.throttle = ScanThrottle()
         self.view = DuplicateFinderView()
         self.current_duplicates: Optional[List[ImageGroup]] = None
         self.scanning_thread: Optional[threading.Thread] = None
@@ -21,6 +26,7 @@ class DuplicateFinderController:
         self.view.on_scan_start = self._handle_scan_start
         self.view.on_delete = self._handle_delete
         self.view.on_cancel = self._handle_cancel
+        self.view.on_throttle_change = self._handle_throttle_change
         
         # Set up model callbacks
         self.model.set_progress_callback(self.view.update_progress)
@@ -30,6 +36,22 @@ class DuplicateFinderController:
         """Check if scan has been cancelled."""
         return self.cancel_scan
 
+    def _handle_throttle_change(self, enabled: bool, mbps: Optional[float], files_per_second: Optional[float]):
+        """Apply background mode and limits; limits take effect immediately."""
+        throttle = self.model.throttle
+        # Priority is lowered when a scan thread starts, so this applies from the next scan
+        throttle.low_priority = enabled
+        throttle.set_limits(mbps * 1024 * 1024 if mbps else None, files_per_second)
+
+    def _refresh_throughput(self):
+        """Periodically show effective throughput while scanning."""
+        if not self.scanning_thread or not self.scanning_thread.is_alive():
+            self.view.clear_throughput()
+            return
+        bytes_per_second, files_per_second = self.model.throttle.throughput()
+        self.view.update_throughput(bytes_per_second / (1024 * 1024), files_per_second)
+        self.view.window.after(self.THROUGHPUT_REFRESH_MS, self._refresh_throughput)
+
     def _handle_folder_select(self):
         """Handle folder selection."""
         folder = self.view.browse_folder()
@@ -65,6 +87,7 @@ class DuplicateFinderController:
         self.view.show_scanning_message()
         self.scanning_thread = threading.Thread(target=scan_thread, daemon=True)
         self.scanning_thread.start()
+        self.view.window.after(self.THROUGHPUT_REFRESH_MS, self._refresh_throughput)
 
     def _show_scan_results(self):
         """Show scan results in the view."""
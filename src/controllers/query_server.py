@@ -0,0 +1,289 @@
+"""
+Local query server that answers "is this image already indexed?" lookups
+from a warm in-memory ImageFinder index.
+"""
+import re
+import json
+import stat
+import time
+import logging
+import threading
+import socketserver
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from ..models.image_finder import ImageFinder
+
+logger = logging.getLogger(__name__)
+
+# Number of set bits for every byte value, used for vectorised popcount
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+_HASH_BYTES = 16  # Room for hashes up to 128 bits
+_HEX_HASH = re.compile(rf'[0-9a-f]{{1,{_HASH_BYTES * 2}}}')
+
+
+def _hash_to_bytes(hash_val: str) -> np.ndarray:
+    """Convert a hex hash into a fixed-width big-endian byte row."""
+    return np.frombuffer(int(hash_val, 16).to_bytes(_HASH_BYTES, 'big'), dtype=np.uint8)
+
+
+class QueryServer:
+    """
+    Serve lookups against an ImageFinder index over HTTP.
+
+    The server listens on a localhost TCP port or, if ``socket_path`` is
+    given, on a Unix domain socket. Endpoints:
+
+    - ``GET /lookup?path=...`` or ``GET /lookup?hash=...``
+    - ``POST /lookup`` with the encoded image as the request body
+    - ``GET /stats`` for index size, latency and throughput
+
+    Every lookup accepts an optional ``radius`` query parameter giving the
+    maximum Hamming distance for a match (default 0, exact hash match).
+    """
+
+    LATENCY_SAMPLES = 1000
+    MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+
+    def __init__(
+            self,
+            finder: ImageFinder,
+            host: str = '127.0.0.1',
+            port: int = 8765,
+            socket_path: Optional[Union[str, Path]] = None
+        ):
+        self.finder = finder
+        self.host = host
+        self.port = port
+        self.socket_path = Path(socket_path) if socket_path else None
+        self._httpd: Optional[socketserver.BaseServer] = None
+
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._requests = 0
+        self._failures = 0
+        self._latencies: Deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+        self._hashes: List[str] = []
+        self._hash_matrix = np.zeros((0, _HASH_BYTES), dtype=np.uint8)
+        self.refresh_index()
+
+    def load(self, folder: Union[str, Path]) -> None:
+        """Scan a folder once and make its hashes available to queries."""
+        self.finder.find_duplicates(folder)
+        self.refresh_index()
+
+    def refresh_index(self) -> None:
+        """Rebuild the lookup matrix from the finder's current index."""
+        hashes = list(self.finder.image_hashes.keys())
+        matrix = np.zeros((len(hashes), _HASH_BYTES), dtype=np.uint8)
+        for row, hash_val in enumerate(hashes):
+            matrix[row] = _hash_to_bytes(hash_val)
+        with self._lock:
+            self._hashes = hashes
+            self._hash_matrix = matrix
+
+    def lookup(self, hash_val: str, radius: int = 0) -> List[Dict[str, Any]]:
+        """
+        Find indexed images whose hash is within radius bits of hash_val.
+
+        :return: Matches sorted by distance, each with path, hash and distance
+        """
+        if radius <= 0:
+            return [
+                {'path': str(path), 'hash': hash_val, 'distance': 0}
+                for path in self.finder.image_hashes.get(hash_val, [])
+            ]
+
+        with self._lock:
+            hashes, matrix = self._hashes, self._hash_matrix
+        if not hashes:
+            return []
+        distances = _POPCOUNT[matrix ^ _hash_to_bytes(hash_val)].sum(axis=1, dtype=np.int32)
+        rows = np.flatnonzero(distances <= radius)
+        rows = rows[np.argsort(distances[rows], kind='stable')]
+
+        matches = []
+        for row in rows:
+            match_hash = hashes[row]
+            for path in self.finder.image_hashes.get(match_hash, []):
+                matches.append({'path': str(path), 'hash': match_hash,
+                                'distance': int(distances[row])})
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and request latency/throughput figures."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            requests = self._requests
+            failures = self._failures
+            distinct = len(self._hashes)
+        uptime = time.monotonic() - self._started_at
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            'images': sum(len(paths) for paths in self.finder.image_hashes.values()),
+            'distinct_hashes': distinct,
+            'requests': requests,
+            'failures': failures,
+            'uptime_seconds': uptime,
+            'requests_per_second': requests / uptime if uptime > 0 else 0.0,
+            'latency_ms': {
+                'mean': (sum(latencies) / len(latencies) * 1000) if latencies else None,
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+            },
+        }
+
+    def _record(self, elapsed: float, ok: bool) -> None:
+        """Record the outcome of one request for the stats endpoint."""
+        with self._lock:
+            self._requests += 1
+            if not ok:
+                self._failures += 1
+            self._latencies.append(elapsed)
+
+    def handle_lookup(self, params: Dict[str, List[str]], body: Optional[bytes]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Resolve a lookup request into an HTTP status and JSON payload.
+
+        The query hash comes from (in order) the request body, a ``hash``
+        parameter, or a ``path`` parameter. Images are hashed with the
+        finder's current match key, the same one the index was built with.
+        """
+        try:
+            radius = int(params.get('radius', ['0'])[0])
+        except ValueError:
+            return 400, {'error': 'radius must be an integer'}
+
+        error = None
+        if body:
+            hash_val, error = self.finder.compute_query_key(data=body)
+        elif 'hash' in params:
+            hash_val = params['hash'][0].strip().lower()
+            if not _HEX_HASH.fullmatch(hash_val):
+                return 400, {'error': f"hash must be 1 to {_HASH_BYTES * 2} hexadecimal digits"}
+            hash_val = self._normalise_hash(hash_val)
+        elif 'path' in params:
+            path = Path(params['path'][0])
+            if not path.is_file():
+                return 404, {'error': f"File {path} does not exist"}
+            hash_val, error = self.finder.compute_query_key(path)
+        else:
+            return 400, {'error': 'Provide an image body, a hash or a path'}
+
+        if hash_val is None:
+            return 422, {'error': error or 'Could not hash image'}
+        matches = self.lookup(hash_val, radius)
+        return 200, {'hash': hash_val, 'radius': radius, 'found': bool(matches), 'matches': matches}
+
+    def _normalise_hash(self, hash_val: str) -> str:
+        """Pad a hex hash with leading zeros to the width of the indexed hashes."""
+        with self._lock:
+            width = len(self._hashes[0]) if self._hashes else 0
+        return hash_val.lstrip('0').zfill(width or len(hash_val))
+
+    def _make_server(self) -> socketserver.BaseServer:
+        """Create the listening server for the configured address."""
+        handler = type('BoundQueryHandler', (_QueryHandler,), {'query_server': self})
+        if self.socket_path:
+            if self.socket_path.is_symlink() or self.socket_path.exists():
+                # Only replace a stale socket, never a regular file
+                if not stat.S_ISSOCK(self.socket_path.lstat().st_mode):
+                    raise FileExistsError(f"{self.socket_path} exists and is not a socket")
+                self.socket_path.unlink()
+            server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), handler)
+            server.daemon_threads = True
+            return server
+        return ThreadingHTTPServer((self.host, self.port), handler)
+
+    @property
+    def address(self) -> Union[str, Tuple[str, int]]:
+        """Return the bound socket path or (host, port) of a started server."""
+        if self._httpd is None:
+            return str(self.socket_path) if self.socket_path else (self.host, self.port)
+        return self._httpd.server_address
+
+    def start(self) -> None:
+        """Bind the server socket without blocking."""
+        if self._httpd is None:
+            self._httpd = self._make_server()
+            logger.info(f"Query server listening on {self.address}")
+
+    def serve_forever(self) -> None:
+        """Bind (if needed) and serve requests until shutdown() is called."""
+        self.start()
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+            if self.socket_path and self.socket_path.exists():
+                self.socket_path.unlink()
+            self._httpd = None
+
+    def shutdown(self) -> None:
+        """Stop a server running in serve_forever()."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    """HTTP request handler that delegates to its QueryServer."""
+
+    query_server: QueryServer
+
+    def do_GET(self):
+        self._dispatch(None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > self.query_server.MAX_UPLOAD_BYTES:
+            self._send(413, {'error': 'Upload too large'})
+            return
+        self._dispatch(self.rfile.read(length) if length else b'')
+
+    def _dispatch(self, body: Optional[bytes]):
+        """Route a request and record its latency."""
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        server = self.query_server
+
+        if url.path == '/stats':
+            self._send(200, server.stats())
+            return
+        if url.path != '/lookup':
+            status, payload = 404, {'error': f"Unknown endpoint {url.path}"}
+        elif body is not None and not body:
+            status, payload = 400, {'error': 'Empty request body'}
+        else:
+            try:
+                status, payload = server.handle_lookup(params, body)
+            except Exception as e:
+                logger.exception("Lookup failed")
+                status, payload = 500, {'error': str(e)}
+        server._record(time.perf_counter() - start, status == 200)
+        self._send(status, payload)
+
+    def _send(self, status: int, payload: Dict[str, Any]):
+        """Write a JSON response."""
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
@@ -0,0 +1,234 @@
+"""
+Streaming access to images stored inside zip and tar archives.
+"""
+import os
+import json
+import hashlib
+import tarfile
+import zipfile
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class ArchiveMember:
+    """An image stored in an archive."""
+    name: str
+    size: int
+    offset: Optional[int] = None  # Data offset, for uncompressed tar members
+
+
+class ArchiveReader:
+    """
+    Read images out of archives without extracting them to disk.
+
+    Members are addressed as ``<archive>!<member>`` paths so they can sit in
+    duplicate groups next to loose files. Zip members are read through the
+    central directory; tar archives, including compressed ones, are streamed
+    in a single sequential pass. The list of image members of each archive
+    is cached, keyed by the archive's size and mtime, in memory and as JSON
+    under ``cache_dir``.
+    """
+
+    SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+    SEPARATOR = '!'
+    DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'delete_duplicate_images' / 'archives'
+
+    def __init__(self, is_supported: Callable[[Path], bool], cache_dir: Optional[Path] = DEFAULT_CACHE_DIR):
+        self.is_supported = is_supported
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._index: Dict[Path, Tuple[Tuple[int, int], List[ArchiveMember]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_archive(cls, path: Path) -> bool:
+        """Check if the file name has a supported archive suffix."""
+        name = path.name.lower()
+        return not name.startswith('._') and name.endswith(cls.SUFFIXES)
+
+    @classmethod
+    def member_path(cls, archive: Path, name: str) -> Path:
+        """Build the virtual path of an archive member."""
+        return Path(f"{archive}{cls.SEPARATOR}{name}")
+
+    @classmethod
+    def split_member_path(cls, path: Path) -> Optional[Tuple[Path, str]]:
+        """Split a virtual member path into (archive, member name), or None for loose files."""
+        text = str(path)
+        start = 0
+        while True:
+            idx = text.find(cls.SEPARATOR, start)
+            if idx < 0:
+                return None
+            archive = Path(text[:idx])
+            if cls.is_archive(archive) and archive.is_file():
+                return archive, text[idx + 1:]
+            start = idx + 1
+
+    @staticmethod
+    def _is_zip(archive: Path) -> bool:
+        return archive.name.lower().endswith('.zip')
+
+    def cached_members(self, archive: Path) -> Optional[List[ArchiveMember]]:
+        """Return the cached member list if the archive is unchanged, without reading it."""
+        try:
+            st = archive.stat()
+        except OSError:
+            return None
+        key = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._index.get(archive)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        cache_file = self._cache_file(archive)
+        if cache_file and cache_file.exists():
+            try:
+                data = json.loads(cache_file.read_text())
+                if tuple(data['key']) == key:
+                    members = [ArchiveMember(**m) for m in data['members']]
+                    with self._lock:
+                        self._index[archive] = (key, members)
+                    return members
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        return None
+
+    def members(self, archive: Path) -> List[ArchiveMember]:
+        """Return the image members of an archive, building the index if needed."""
+        members = self.cached_members(archive)
+        if members is not None:
+            return members
+        if self._is_zip(archive):
+            with zipfile.ZipFile(archive) as zf:
+                members = [
+                    ArchiveMember(info.filename, info.file_size)
+                    for info in zf.infolist()
+                    if not info.is_dir() and self.is_supported(Path(info.filename))
+                ]
+        else:
+            with tarfile.open(archive, 'r:*') as tf:
+                members = [
+                    ArchiveMember(info.name, info.size, info.offset_data)
+                    for info in tf
+                    if info.isfile() and self.is_supported(Path(info.name))
+                ]
+        self._store(archive, members)
+        return members
+
+    def iter_images(self, archive: Path) -> Iterator[Tuple[Path, bytes]]:
+        """
+        Stream (virtual path, bytes) for every image in the archive.
+
+        Nothing is written to disk. Tar archives are read front to back in
+        stream mode, so compressed tars are decompressed exactly once, and
+        the member index is recorded during the same pass.
+        """
+        if self._is_zip(archive):
+            members = self.members(archive)
+            with zipfile.ZipFile(archive) as zf:
+                for member in members:
+                    yield self.member_path(archive, member.name), zf.read(member.name)
+            return
+
+        members = []
+        with tarfile.open(archive, 'r|*') as tf:
+            for info in tf:
+                if not info.isfile() or not self.is_supported(Path(info.name)):
+                    continue
+                members.append(ArchiveMember(info.name, info.size, info.offset_data))
+                fileobj = tf.extractfile(info)
+                yield self.member_path(archive, info.name), fileobj.read()
+        if self.cached_members(archive) is None:
+            self._store(archive, members)
+
+    def read_member(self, path: Path) -> bytes:
+        """Read a single member by its virtual path (random access)."""
+        split = self.split_member_path(path)
+        if split is None:
+            raise FileNotFoundError(f"{path} is not an archive member")
+        archive, name = split
+        if self._is_zip(archive):
+            with zipfile.ZipFile(archive) as zf:
+                return zf.read(name)
+
+        if archive.name.lower().endswith('.tar'):
+            # Uncompressed tar: seek straight to the cached data offset
+            for member in self.members(archive):
+                if member.name == name and member.offset is not None:
+                    with open(archive, 'rb') as f:
+                        f.seek(member.offset)
+                        return f.read(member.size)
+        with tarfile.open(archive, 'r:*') as tf:
+            fileobj = tf.extractfile(name)
+            if fileobj is None:
+                raise FileNotFoundError(f"{name} is not a file in {archive}")
+            return fileobj.read()
+
+    def read_members(self, paths: Iterable[Path]) -> Dict[Path, bytes]:
+        """
+        Read many members by virtual path, opening each archive once.
+
+        Random access into a compressed tar decompresses it from the start,
+        so the wanted members of such archives are collected in a single
+        streaming pass instead. Members that cannot be read are left out.
+        """
+        wanted: Dict[Path, Dict[str, Path]] = {}
+        for path in paths:
+            split = self.split_member_path(path)
+            if split is not None:
+                wanted.setdefault(split[0], {})[split[1]] = path
+
+        data: Dict[Path, bytes] = {}
+        for archive, names in wanted.items():
+            try:
+                if self._is_zip(archive):
+                    with zipfile.ZipFile(archive) as zf:
+                        for name, path in names.items():
+                            data[path] = zf.read(name)
+                elif archive.name.lower().endswith('.tar'):
+                    for path in names.values():
+                        data[path] = self.read_member(path)
+                else:
+                    remaining = len(names)
+                    with tarfile.open(archive, 'r|*') as tf:
+                        for info in tf:
+                            path = names.get(info.name)
+                            if path is None or not info.isfile() or path in data:
+                                continue
+                            data[path] = tf.extractfile(info).read()
+                            remaining -= 1
+                            if not remaining:
+                                break
+            except (OSError, KeyError, tarfile.TarError, zipfile.BadZipFile):
+                continue  # Callers fall back to read_member() and report the error
+        return data
+
+    def _cache_file(self, archive: Path) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(os.fsencode(archive.resolve())).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def _store(self, archive: Path, members: List[ArchiveMember]) -> None:
+        """Cache a member list in memory and on disk."""
+        try:
+            st = archive.stat()
+        except OSError:
+            return
+        key = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            self._index[archive] = (key, members)
+        cache_file = self._cache_file(archive)
+        if cache_file:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(json.dumps({
+                    'archive': str(archive),
+                    'key': list(key),
+                    'members': [asdict(m) for m in members],
+                }))
+            except OSError:
+                pass  # Cache is an optimisation only
@@ -0,0 +1,345 @@
+"""
+Folder watcher that keeps an ImageFinder index live as files change on disk.
+"""
+import os
+import sys
+import stat
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple, Callable, Optional, Union
+from .image_finder import ImageFinder, ImageGroup
+from .archive_reader import ArchiveReader
+
+# inotify event masks (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class _Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: Path, mask: int = WATCH_MASK) -> int:
+        """Watch a single directory and return its watch descriptor."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        return wd
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """Read all pending events as (wd, mask, name) tuples."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        """Release the inotify file descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FolderWatcher:
+    """
+    Watch a folder and incrementally update an ImageFinder index.
+
+    Uses inotify on Linux and falls back to periodic polling elsewhere (or
+    when inotify is unavailable). Change events are coalesced per path and
+    flushed once the folder has been quiet for ``debounce`` seconds, as soon
+    as ``max_batch`` distinct paths are pending, or at the latest
+    ``max_latency`` seconds (default twice the debounce) after the first
+    pending change. Bulk copies are processed in batches rather than file by
+    file, while a steady trickle of uploads is still reported promptly.
+    """
+
+    DEBOUNCE_SECONDS = 0.5
+    POLL_INTERVAL = 2.0
+
+    def __init__(
+            self,
+            finder: ImageFinder,
+            folder: Union[str, Path],
+            on_duplicate: Optional[Callable[[Path, ImageGroup], None]] = None,
+            debounce: float = DEBOUNCE_SECONDS,
+            max_batch: int = ImageFinder.BATCH_SIZE,
+            poll_interval: float = POLL_INTERVAL,
+            use_inotify: Optional[bool] = None,
+            max_latency: Optional[float] = None
+        ):
+        self.finder = finder
+        self.folder = Path(folder)
+        self.on_duplicate = on_duplicate
+        self.debounce = debounce
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.max_latency = max_latency if max_latency is not None else 2 * debounce
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith('linux')
+        self.use_inotify = use_inotify
+
+        # Pending changes: path -> True if (re)hash needed, False if deleted
+        self._pending: Dict[Path, bool] = {}
+        self._last_event: float = 0.0
+        self._first_event: float = 0.0
+        self._stop = threading.Event()
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, Path] = {}
+        self._snapshot: Dict[Path, Tuple[int, int]] = {}
+        self.mode: str = 'inotify' if use_inotify else 'polling'
+
+    def stop(self) -> None:
+        """Ask a running watcher to exit after its current iteration."""
+        self._stop.set()
+
+    def run(self) -> None:
+        """
+        Block and process changes until stop() is called.
+
+        The finder's current index is used as the starting point; no full
+        rescan is performed.
+        """
+        if not self.folder.exists():
+            raise ValueError(f"Folder {self.folder} does not exist")
+
+        self._stop.clear()
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._watch_tree(self.folder)
+            except (OSError, AttributeError) as e:
+                self.finder.errors.append(f"inotify unavailable, falling back to polling: {e}")
+                self._close_inotify()
+        if not self._inotify:
+            self.mode = 'polling'
+        # Known file state, used to detect changes after lost inotify events too
+        self._snapshot = self._take_snapshot()
+
+        try:
+            while not self._stop.is_set():
+                if self._inotify:
+                    self._wait_inotify()
+                else:
+                    self._wait_polling()
+                self._maybe_flush()
+            self.flush()
+        finally:
+            self._close_inotify()
+
+    def flush(self) -> List[Tuple[Path, ImageGroup]]:
+        """
+        Apply all pending changes to the index now.
+
+        :return: (path, group) pairs for each changed file that now has duplicates
+        """
+        pending, self._pending = self._pending, {}
+        events: List[Tuple[Path, ImageGroup]] = []
+
+        # Apply deletions first so re-added paths never see stale entries
+        for path, changed in pending.items():
+            if not changed:
+                self.finder.remove_image(path)
+                self._snapshot.pop(path, None)
+
+        for path, changed in pending.items():
+            if not changed:
+                continue
+            stat_key = self._stat_key(path)
+            if stat_key is None:
+                self.finder.remove_image(path)
+                self._snapshot.pop(path, None)
+                continue
+            self._snapshot[path] = stat_key
+            hash_val = self.finder.add_image(path)
+            if hash_val:
+                group = self.finder.get_group(hash_val)
+                if len(group.paths) > 1:
+                    events.append((path, group))
+
+        if self.on_duplicate:
+            for path, group in events:
+                self.on_duplicate(path, group)
+        return events
+
+    def _queue(self, path: Path, changed: bool) -> None:
+        """Coalesce a change for path into the pending batch."""
+        if changed and not self.finder.is_supported_image(path):
+            return
+        if not self._pending:
+            self._first_event = time.monotonic()
+        self._pending[path] = changed
+        self._last_event = time.monotonic()
+
+    def _maybe_flush(self) -> None:
+        """Flush when the batch is full, the folder has gone quiet or the oldest change is due."""
+        if not self._pending:
+            return
+        now = time.monotonic()
+        quiet = now - self._last_event >= self.debounce
+        overdue = now - self._first_event >= self.max_latency
+        if quiet or overdue or len(self._pending) >= self.max_batch:
+            self.flush()
+
+    def _close_inotify(self) -> None:
+        """Close the inotify descriptor and forget all watches."""
+        if self._inotify:
+            self._inotify.close()
+        self._inotify = None
+        self._watches.clear()
+
+    def _watch_tree(self, root: Path) -> None:
+        """Add watches for root and all of its subdirectories."""
+        for dirpath, _dirnames, _filenames in os.walk(root):
+            wd = self._inotify.add_watch(Path(dirpath))
+            self._watches[wd] = Path(dirpath)
+
+    def _wait_inotify(self) -> None:
+        """Wait for inotify events and queue the affected paths."""
+        timeout = self.debounce if self._pending else self.poll_interval
+        try:
+            ready, _, _ = select.select([self._inotify.fd], [], [], timeout)
+        except InterruptedError:
+            return
+        if not ready:
+            return
+
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # Kernel queue overflowed and events were lost
+                self._reconcile()
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            parent = self._watches.get(wd)
+            if parent is None:
+                continue
+            path = parent / name if name else parent
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_new_dir(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._queue_removed_dir(path)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                continue
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._queue(path, True)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._queue(path, False)
+
+    def _try_watch_tree(self, path: Path) -> bool:
+        """Watch a directory tree, recording errors instead of raising."""
+        try:
+            self._watch_tree(path)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                self.finder.errors.append(
+                    f"inotify watch limit reached, {path} will not be watched")
+            elif e.errno != errno.ENOENT:
+                self.finder.errors.append(f"Error watching {path}: {e}")
+            return False
+        return True
+
+    def _watch_new_dir(self, path: Path) -> None:
+        """Watch a newly created directory and queue anything already inside it."""
+        if not self._try_watch_tree(path):
+            return
+        for file in self.finder._get_image_files(path):
+            self._queue(file, True)
+
+    def _queue_removed_dir(self, path: Path) -> None:
+        """Queue removal of every indexed image below a removed directory."""
+        for indexed in list(self.finder._path_hashes):
+            if path in indexed.parents:
+                self._queue(indexed, False)
+
+    def _reconcile(self) -> None:
+        """
+        Bring the index back in line with the disk after lost inotify events.
+
+        Directories created in the meantime are watched, indexed images that
+        no longer exist are removed, and only files whose mtime or size
+        differs from the last known state are re-hashed.
+        """
+        self._try_watch_tree(self.folder)
+        self._queue_tree_changes()
+        for path in list(self.finder._path_hashes):
+            if path in self._snapshot or self.folder not in path.parents:
+                continue
+            if ArchiveReader.split_member_path(path) is None:
+                self._queue(path, False)
+
+    @staticmethod
+    def _stat_key(path: Path) -> Optional[Tuple[int, int]]:
+        """Return (mtime_ns, size) of a regular file, or None if it is gone."""
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size) if stat.S_ISREG(st.st_mode) else None
+
+    def _take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        """Stat every supported image below the folder."""
+        snapshot = {}
+        for file in self.finder._get_image_files(self.folder):
+            stat_key = self._stat_key(file)
+            if stat_key is not None:
+                snapshot[file] = stat_key
+        return snapshot
+
+    def _queue_tree_changes(self) -> None:
+        """Diff a fresh snapshot against the previous one and queue changes."""
+        snapshot = self._take_snapshot()
+        for path, sig in snapshot.items():
+            if self._snapshot.get(path) != sig:
+                self._queue(path, True)
+        for path in self._snapshot.keys() - snapshot.keys():
+            self._queue(path, False)
+        self._snapshot = snapshot
+
+    def _wait_polling(self) -> None:
+        """Sleep for one poll interval and queue anything that changed."""
+        if self._stop.wait(self.poll_interval):
+            return
+        self._queue_tree_changes()
@@ -0,0 +1,120 @@
+"""
+Verification of candidate duplicate groups with a higher resolution pixel comparison.
+"""
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from .image_finder import ImageGroup
+
+
+@dataclass
+class VerificationStats:
+    """Work done by the most recent verification pass."""
+    groups_checked: int = 0
+    images_checked: int = 0
+    groups_split: int = 0
+    images_rejected: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def images_per_second(self) -> float:
+        return self.images_checked / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class GroupVerifier:
+    """
+    Confirm hash collisions by comparing downscaled pixels.
+
+    Each member of a candidate group is reduced to a ``size`` x ``size``
+    RGB array scaled to [0, 1]. Members are clustered greedily: the first
+    unassigned image becomes a reference and every remaining image with the
+    same aspect ratio (within ``ASPECT_TOLERANCE``) whose mean absolute
+    difference from it is at most ``threshold`` joins its cluster, computed
+    for all remaining images in one vectorised step. Colour is compared
+    because different hues can share the same grayscale brightness.
+    Clusters of one are dropped. Only images already in candidate groups are
+    decoded, so the cost scales with the number of candidates, not the corpus.
+    """
+
+    SIZE = 64
+    THRESHOLD = 0.04  # Mean absolute difference on a 0..1 scale
+    ASPECT_TOLERANCE = 0.02  # Relative difference in width / height
+
+    def __init__(self, size: int = SIZE, threshold: float = THRESHOLD):
+        self.size = size
+        self.threshold = threshold
+        self.stats = VerificationStats()
+
+    def verify(self, groups: List[ImageGroup], finder) -> List[ImageGroup]:
+        """
+        Split candidate groups into clusters of genuinely matching images.
+
+        :param groups: Candidate ImageGroups from hashing
+        :param finder: ImageFinder used to open images and record errors
+        :return: Verified ImageGroups, each with at least two members, or an
+                 empty list if the finder's scan was cancelled
+        """
+        self.stats = VerificationStats()
+        started = time.perf_counter()
+        verified = []
+        # Read candidate archive members up front, one pass per archive
+        members = finder.archive_reader.read_members(
+            path for group in groups for path in group.paths) if finder.archive_reader else {}
+
+        for group in groups:
+            if finder._cancel_callback and finder._cancel_callback():
+                # Partial results would hide every unverified group
+                verified = []
+                break
+            self.stats.groups_checked += 1
+            paths, arrays, aspects = [], [], []
+            for path in group.paths:
+                loaded = self._load(path, finder, members.pop(path, None))
+                self.stats.images_checked += 1
+                if loaded is not None:
+                    paths.append(path)
+                    arrays.append(loaded[0])
+                    aspects.append(loaded[1])
+
+            clusters = self._cluster(np.stack(arrays), np.array(aspects)) if arrays else []
+            kept = [c for c in clusters if len(c) > 1]
+            if len(kept) != 1 or len(kept[0]) != len(group.paths):
+                self.stats.groups_split += 1
+            self.stats.images_rejected += len(group.paths) - sum(len(c) for c in kept)
+            for cluster in kept:
+                verified.append(ImageGroup(hash_value=group.hash_value,
+                                           paths=[paths[i] for i in cluster]))
+
+        self.stats.elapsed = time.perf_counter() - started
+        return verified
+
+    def _cluster(self, stack: np.ndarray, aspects: np.ndarray) -> List[List[int]]:
+        """Greedily cluster same-shaped images whose difference to a reference is within threshold."""
+        remaining = np.arange(len(stack))
+        clusters = []
+        while remaining.size:
+            reference = stack[remaining[0]]
+            diffs = np.abs(stack[remaining] - reference).mean(axis=(1, 2, 3))
+            ref_aspect = aspects[remaining[0]]
+            same_shape = np.abs(aspects[remaining] - ref_aspect) <= ref_aspect * self.ASPECT_TOLERANCE
+            matched = (diffs <= self.threshold) & same_shape
+            clusters.append(remaining[matched].tolist())
+            remaining = remaining[~matched]
+        return clusters
+
+    def _load(self, path: Path, finder, data: Optional[bytes] = None) -> Optional[Tuple[np.ndarray, float]]:
+        """Decode an image (or its already read bytes) to a normalised size x size RGB array and its aspect ratio."""
+        try:
+            with finder._open_image(path, data) as img:
+                aspect = img.width / max(img.height, 1)
+                # JPEGs can decode at reduced scale; we only need size x size
+                img.draft('RGB', (self.size * 2, self.size * 2))
+                with finder._decode_budget(img, None):
+                    small = img.convert('RGB').resize((self.size, self.size), Image.Resampling.BOX)
+                    return np.asarray(small, dtype=np.float32) / 255.0, aspect
+        except Exception as e:
+            finder.errors.append(f"Error verifying {path.name}: {str(e)}")
+            return None
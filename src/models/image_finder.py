@@ -1,13 +1,26 @@
 """
 Image finder model that handles the core business logic for finding and managing duplicate images.
 """
+import io
+import time
+import hashlib
+from contextlib import contextmanager
 from pathlib import Path
 from PIL import Image
 from collections import defaultdict
 import numpy as np
-from typing import List, Dict, Tuple, Callable, Optional, Union, Iterator
+from typing import List, Dict, Tuple, Callable, Optional, Union, Iterator, TYPE_CHECKING
 from dataclasses import dataclass
 from pillow_heif import register_heif_opener
+from .io_scheduler import IOScheduler
+from .scan_engine import ScanEngine
+from .memory_budget import MemoryBudget, MemoryBudgetExceeded, estimate_decode_bytes
+from .keep_policy import KeepPolicy
+from .throttle import ScanThrottle
+from .archive_reader import ArchiveReader
+
+if TYPE_CHECKING:
+    from .group_verifier import GroupVerifier
 
 # Register HEIF opener with Pillow
 register_heif_opener()
@@ -18,16 +31,66 @@ class ImageGroup:
     hash_value: str
     paths: List[Path]
 
+@dataclass
+class ImageSignature:
+    """Signatures extracted from a single decode of an image."""
+    path: Path
+    average_hash: str
+    difference_hash: str
+    pixel_digest: str  # Digest of the decoded pixels, ignores metadata and encoding
+    width: int
+    height: int
+    format: Optional[str]
+    mode: str
+
+@dataclass
+class ScanStats:
+    """Throughput figures for the most recent scan."""
+    files: int = 0
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    read_seconds: float = 0.0  # Summed over reader threads (parallel scans only)
+    decode_seconds: float = 0.0  # Summed over decoder threads (parallel scans only)
+    readers: int = 1
+    decoders: int = 1
+    autotuned: bool = False
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes_read / (1024 * 1024) / self.elapsed if self.elapsed > 0 else 0.0
+
 class ImageFinder:
     """Find and manage duplicate images."""
     
     SUPPORTED_FORMATS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.heic', '.heif'}
     BATCH_SIZE = 100  # Process images in batches of 100
     HASH_SIZE = 8  # Size of the perceptual hash (8x8 pixels)
+    MATCH_KEYS = ('average_hash', 'difference_hash', 'pixel_digest')
+    REDUCED_DECODE_SIZE = 512  # Minimum edge kept when large JPEGs are decoded at reduced scale
     
     def __init__(self):
         self.image_hashes: Dict[str, List[Path]] = defaultdict(list)
+        self.signatures: Dict[Path, ImageSignature] = {}
+        self.match_key: str = 'average_hash'
+        self.collect_signatures: bool = False
+        self._path_hashes: Dict[Path, str] = {}
         self.errors: List[str] = []
+        self.scan_stats = ScanStats()
+        self.io_scheduler: Optional[IOScheduler] = None
+        self.readers: Optional[int] = None
+        self.decoders: Optional[int] = None
+        self.autotune: bool = False
+        self.memory_budget: Optional[MemoryBudget] = None
+        self.keep_policy: Optional[KeepPolicy] = None
+        self.verifier: Optional['GroupVerifier'] = None
+        self.throttle: Optional[ScanThrottle] = None
+        self.archive_reader: Optional[ArchiveReader] = None
+        self.degraded_images: List[Path] = []
+        self.skipped_images: List[Path] = []
         self._progress_callback: Optional[Callable[[float], None]] = None
         self._cancel_callback: Optional[Callable[[], bool]] = None
         self._current_progress: int = 0
@@ -53,38 +116,211 @@ class ImageFinder:
             return False
         return file_path.suffix.lower() in self.SUPPORTED_FORMATS
 
-    def compute_image_hash(self, image_path: Path) -> Optional[str]:
+    def enable_archives(self, cache_dir: Optional[Path] = ArchiveReader.DEFAULT_CACHE_DIR) -> None:
+        """Also scan images inside zip and tar archives, addressed as archive!member."""
+        self.archive_reader = ArchiveReader(self.is_supported_image, cache_dir)
+
+    def _open_image(self, image_path: Path, data: Optional[bytes] = None) -> Image.Image:
+        """Open an image from disk, or from its already read bytes if given."""
+        if data is None and self.archive_reader and ArchiveReader.split_member_path(image_path):
+            data = self.archive_reader.read_member(image_path)
+        return Image.open(io.BytesIO(data) if data is not None else image_path)
+
+    def compute_image_hash(self, image_path: Path, data: Optional[bytes] = None) -> Optional[str]:
         """
         Compute perceptual hash for an image using average hash algorithm.
         More efficient than MD5 and better at finding visually similar images.
         """
         try:
-            with Image.open(image_path) as img:
-                # Convert to grayscale and resize in one step
-                # Using NEAREST resampling for speed, and small size for memory efficiency
-                img = img.convert('L').resize((self.HASH_SIZE + 1, self.HASH_SIZE + 1), 
-                                            Image.Resampling.NEAREST)
-                
-                # Calculate average value - using numpy for efficiency
-                pixels = np.array(img)
-                avg = pixels.mean()
-                
-                # Compute hash - each bit represents whether pixel is above average
-                diff = pixels > avg
-                # Convert boolean array to hash string
-                # Using ravel() is faster than flatten()
-                hash_bits = ''.join(str(int(b)) for b in diff.ravel())
-                
-                # Convert to hexadecimal for shorter string
-                hash_int = int(hash_bits, 2)
-                hash_hex = f"{hash_int:016x}"
-                
-                return hash_hex
-                
+            return self._image_hash(image_path, data)
+        except MemoryBudgetExceeded as e:
+            self.skipped_images.append(image_path)
+            self.errors.append(f"Skipped {image_path.name}: {str(e)}")
+            return None
+        except Exception as e:
+            self.errors.append(f"Error processing {image_path.name}: {str(e)}")
+            return None
+
+    def _image_hash(self, image_path: Optional[Path], data: Optional[bytes] = None) -> str:
+        """Compute the average hash of an image, raising on failure."""
+        with self._open_image(image_path, data) as img:
+            with self._decode_budget(img, image_path):
+                return self._hash_image(img)
+
+    @contextmanager
+    def _decode_budget(self, img: Image.Image, image_path: Optional[Path], exact: bool = False) -> Iterator[None]:
+        """
+        Reserve memory for decoding img under the configured budget.
+
+        The cost is estimated from the image header before any pixels are
+        decoded. Large JPEGs are switched to a reduced-scale DCT decode
+        unless exact pixels are needed; images larger than the whole budget
+        decode alone; images over the budget's hard limit raise
+        MemoryBudgetExceeded.
+        """
+        budget = self.memory_budget
+        if budget is None:
+            yield
+            return
+
+        copies = 2 if exact else 1  # Exact signatures also hold a NumPy copy
+        cost = estimate_decode_bytes(img, copies)
+        large = budget.large_image_bytes
+        if large is not None and cost > large and not exact and img.format == 'JPEG':
+            img.draft('L', (self.REDUCED_DECODE_SIZE, self.REDUCED_DECODE_SIZE))
+            cost = estimate_decode_bytes(img, copies)
+            if image_path is not None:
+                self.degraded_images.append(image_path)
+        with budget.reserve(cost):
+            yield
+
+    def _hash_image(self, img: Image.Image) -> str:
+        """Compute the average hash of an already opened image."""
+        # Convert to grayscale and resize in one step
+        # Using NEAREST resampling for speed, and small size for memory efficiency
+        if img.mode != 'L':
+            img = img.convert('L')
+        img = img.resize((self.HASH_SIZE + 1, self.HASH_SIZE + 1), Image.Resampling.NEAREST)
+        
+        # Calculate average value - using numpy for efficiency
+        pixels = np.array(img)
+        avg = pixels.mean()
+        
+        # Compute hash - each bit represents whether pixel is above average
+        diff = pixels > avg
+        # Convert boolean array to hash string
+        # Using ravel() is faster than flatten()
+        hash_bits = ''.join(str(int(b)) for b in diff.ravel())
+        
+        # Convert to hexadecimal for shorter string
+        hash_int = int(hash_bits, 2)
+        hash_hex = f"{hash_int:016x}"
+        
+        return hash_hex
+
+    def _difference_hash(self, gray: Image.Image) -> str:
+        """Compute the difference hash of a grayscale image."""
+        small = np.asarray(gray.resize((self.HASH_SIZE + 1, self.HASH_SIZE), Image.Resampling.BILINEAR))
+        # Each bit records whether brightness increases to the right
+        diff = small[:, 1:] > small[:, :-1]
+        hash_int = int.from_bytes(np.packbits(diff.ravel()).tobytes(), 'big')
+        return f"{hash_int:016x}"
+
+    def compute_image_signature(self, image_path: Path, data: Optional[bytes] = None) -> Optional[ImageSignature]:
+        """
+        Decode an image once and extract every signature from that decode.
+
+        The decoded buffer is copied into a single NumPy array; the pixel
+        digest reads it through a zero-copy memoryview and the perceptual
+        hashes share one grayscale conversion.
+        """
+        try:
+            return self._image_signature(image_path, data)
+        except MemoryBudgetExceeded as e:
+            self.skipped_images.append(image_path)
+            self.errors.append(f"Skipped {image_path.name}: {str(e)}")
+            return None
         except Exception as e:
             self.errors.append(f"Error processing {image_path.name}: {str(e)}")
             return None
 
+    def _image_signature(self, image_path: Optional[Path], data: Optional[bytes] = None) -> ImageSignature:
+        """Compute every signature of an image, raising on failure."""
+        with self._open_image(image_path, data) as img, \
+                self._decode_budget(img, image_path, exact=True):
+            image_format = img.format
+            img.load()
+            if img.mode in ('P', 'PA', '1'):
+                # Palette indices depend on the encoder, compare real colours
+                img = img.convert('RGBA' if img.has_transparency_data else 'RGB')
+
+            pixels = np.ascontiguousarray(np.asarray(img))
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(f"{img.mode}:{img.width}x{img.height}:".encode())
+            digest.update(pixels.data)
+
+            gray = img if img.mode == 'L' else img.convert('L')
+            return ImageSignature(
+                path=image_path,
+                average_hash=self._hash_image(gray),
+                difference_hash=self._difference_hash(gray),
+                pixel_digest=digest.hexdigest(),
+                width=img.width,
+                height=img.height,
+                format=image_format,
+                mode=img.mode,
+            )
+
+    def compute_match_key(self, image_path: Path, data: Optional[bytes] = None) -> Optional[str]:
+        """
+        Compute the value images are grouped by under the current match_key.
+
+        Other match keys, or collect_signatures, extract every signature from
+        the same decode and keep it in signatures, so group_by() can regroup
+        later without touching the file again.
+        """
+        if self.match_key == 'average_hash' and not self.collect_signatures:
+            return self.compute_image_hash(image_path, data)
+        signature = self.compute_image_signature(image_path, data)
+        if signature is None:
+            return None
+        self.signatures[image_path] = signature
+        return getattr(signature, self.match_key)
+
+    def compute_query_key(self, image_path: Optional[Path] = None,
+                          data: Optional[bytes] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Compute the match key of an image that is looked up rather than indexed.
+
+        Nothing is recorded on the finder (errors, signatures, skipped or
+        degraded images), so concurrent lookups cannot see each other's
+        failures and repeated queries do not grow any state.
+
+        :param image_path: Image file to read when data is not given
+        :param data: Encoded image bytes
+        :return: (key, None) on success, or (None, error message)
+        """
+        try:
+            if data is None:
+                data = image_path.read_bytes()
+            if self.match_key == 'average_hash':
+                return self._image_hash(None, data), None
+            return getattr(self._image_signature(None, data), self.match_key), None
+        except Exception as e:
+            name = image_path.name if image_path else 'image data'
+            return None, f"Error processing {name}: {str(e)}"
+
+    def set_match_key(self, match_key: str) -> None:
+        """Choose which signature images are grouped by."""
+        if match_key not in self.MATCH_KEYS:
+            raise ValueError(f"Unknown match key {match_key!r}, expected one of {self.MATCH_KEYS}")
+        self.match_key = match_key
+
+    def set_workers(self, readers: Optional[int] = None, decoders: Optional[int] = None,
+                    autotune: bool = False) -> None:
+        """
+        Configure parallel scanning.
+
+        :param readers: Reader threads (pinned, or the starting point when autotuning)
+        :param decoders: Decoder threads (pinned, or the starting point when autotuning)
+        :param autotune: Adjust both pools at runtime to maximise files/sec
+        """
+        self.readers = readers
+        self.decoders = decoders
+        self.autotune = autotune
+
+    def _enter_throttled_worker(self) -> None:
+        """Apply the throttle's priority settings to the calling scan thread."""
+        error = self.throttle.enter_worker()
+        if error:
+            message = f"Could not lower scan priority: {error}"
+            if message not in self.errors:
+                self.errors.append(message)
+
+    def _is_parallel(self) -> bool:
+        """Return True if scans should use the threaded ScanEngine."""
+        return self.autotune or (self.readers or 1) > 1 or (self.decoders or 1) > 1
+
     def _batch_files(self, files: List[Path]) -> Iterator[List[Path]]:
         """Split files into batches for processing."""
         for i in range(0, len(files), self.BATCH_SIZE):
@@ -98,13 +334,43 @@ class ImageFinder:
 
         # Reset state
         self.image_hashes.clear()
+        self.signatures.clear()
+        self._path_hashes.clear()
         self.errors.clear()
+        self.degraded_images.clear()
+        self.skipped_images.clear()
+        self.scan_stats = ScanStats()
+        started = time.perf_counter()
 
         # Get all image files
-        image_files = self._get_image_files(folder)
-        total_files = len(image_files)
+        if self.archive_reader:
+            image_files, archives = self._get_image_and_archive_files(folder)
+        else:
+            image_files, archives = self._get_image_files(folder), []
+        total_files = len(image_files) + self._estimate_archive_members(archives)
         if total_files == 0:
             return []
+        scheduler = self.io_scheduler
+        if scheduler:
+            image_files = scheduler.schedule(image_files)
+
+        if self._is_parallel():
+            engine = ScanEngine(self, readers=self.readers, decoders=self.decoders, autotune=self.autotune)
+            self.scan_stats.autotuned = self.autotune
+            hash_vals = engine.run(image_files)
+            self.scan_stats.elapsed = time.perf_counter() - started
+            if self._cancel_callback and self._cancel_callback():
+                return []
+            # Index in file order so group ordering matches a serial scan
+            for file, hash_val in zip(image_files, hash_vals):
+                if hash_val:
+                    self.image_hashes[hash_val].append(file)
+                    self._path_hashes[file] = hash_val
+            return self._finish_scan(archives, len(image_files), total_files, started)
+
+        throttle = self.throttle
+        if throttle:
+            self._enter_throttled_worker()
 
         files_processed = 0
         # Process files in batches
@@ -115,45 +381,201 @@ class ImageFinder:
             
             # Process each file in the batch
             for file in batch:
+                if scheduler:
+                    scheduler.on_file_start(files_processed)
                 try:
-                    hash_val = self.compute_image_hash(file)
+                    size = file.stat().st_size
+                    if throttle and not throttle.acquire(size, self._cancel_callback):
+                        return []
+                    self.scan_stats.bytes_read += size
+                    hash_val = self.compute_match_key(file)
                     if hash_val:  # Only add if hash computation succeeded
                         self.image_hashes[hash_val].append(file)
+                        self._path_hashes[file] = hash_val
                 except Exception as e:
                     self.errors.append(f"Error processing {file}: {e}")
+                if scheduler:
+                    scheduler.on_file_done(file)
                 
                 files_processed += 1
+                self.scan_stats.files = files_processed
+                self.scan_stats.elapsed = time.perf_counter() - started
                 # Update progress
                 if self._progress_callback:
                     progress = min(1.0, files_processed / total_files)
                     self._progress_callback(progress)
 
-        # Filter for groups with duplicates
-        duplicate_groups = [
-            ImageGroup(hash_value=hash_val, paths=paths)
+        return self._finish_scan(archives, files_processed, total_files, started)
+
+    def _finish_scan(self, archives: List[Path], files_processed: int, total_files: int,
+                     started: float) -> List[ImageGroup]:
+        """Scan archives, then collect duplicate groups, confirming them with the verifier if one is set."""
+        if archives and not self._scan_archives(archives, files_processed, total_files, started):
+            return []
+        groups = self.get_duplicate_groups()
+        if self.verifier and groups:
+            groups = self.verifier.verify(groups, self)
+        return groups
+
+    def get_duplicate_groups(self) -> List[ImageGroup]:
+        """Return the groups of the current index that contain duplicates."""
+        return [
+            ImageGroup(hash_value=hash_val, paths=list(paths))
             for hash_val, paths in self.image_hashes.items()
             if len(paths) > 1
         ]
 
-        return duplicate_groups
+    def group_by(self, key: str) -> List[ImageGroup]:
+        """
+        Regroup the indexed images by another signature without rescanning.
+
+        Signatures kept from the scan are reused. Images indexed by average
+        hash without collect_signatures have none yet, so theirs are
+        computed once (one decode each) and kept for later calls.
+
+        :param key: Signature to group by, one of MATCH_KEYS
+        :return: Groups of images sharing the key, each with at least two members
+        """
+        if key not in self.MATCH_KEYS:
+            raise ValueError(f"Unknown match key {key!r}, expected one of {self.MATCH_KEYS}")
+        if key == self.match_key:
+            return self.get_duplicate_groups()
+
+        groups: Dict[str, List[Path]] = defaultdict(list)
+        for path in self._path_hashes:
+            signature = self.signatures.get(path)
+            if signature is None:
+                signature = self.compute_image_signature(path)
+                if signature is None:
+                    continue
+                self.signatures[path] = signature
+            groups[getattr(signature, key)].append(path)
+        return [
+            ImageGroup(hash_value=value, paths=paths)
+            for value, paths in groups.items()
+            if len(paths) > 1
+        ]
+
+    def add_image(self, image_path: Path) -> Optional[str]:
+        """
+        Hash a single image into the index, replacing any stale entry for it.
+
+        :param image_path: Image to (re)index
+        :return: The new hash, or None if the image could not be hashed
+        """
+        self.remove_image(image_path)
+        hash_val = self.compute_match_key(image_path)
+        if hash_val:
+            self.image_hashes[hash_val].append(image_path)
+            self._path_hashes[image_path] = hash_val
+        return hash_val
+
+    def remove_image(self, image_path: Path) -> Optional[str]:
+        """
+        Drop an image from the index.
+
+        :param image_path: Image to forget
+        :return: The hash it was indexed under, or None if it was not indexed
+        """
+        self.signatures.pop(image_path, None)
+        hash_val = self._path_hashes.pop(image_path, None)
+        if hash_val is None:
+            return None
+        paths = self.image_hashes.get(hash_val)
+        if paths is not None:
+            if image_path in paths:
+                paths.remove(image_path)
+            if not paths:
+                del self.image_hashes[hash_val]
+        return hash_val
+
+    def get_group(self, hash_val: str) -> ImageGroup:
+        """Return every indexed image sharing the given hash."""
+        return ImageGroup(hash_value=hash_val, paths=list(self.image_hashes.get(hash_val, [])))
 
     def _get_image_files(self, folder: Path) -> List[Path]:
         """Get all supported image files in the folder."""
         return [f for f in folder.rglob('*') if self.is_supported_image(f)]
 
+    def _get_image_and_archive_files(self, folder: Path) -> Tuple[List[Path], List[Path]]:
+        """Get supported image files and archives in the folder in a single walk."""
+        images, archives = [], []
+        for f in folder.rglob('*'):
+            if self.is_supported_image(f):
+                images.append(f)
+            elif ArchiveReader.is_archive(f) and f.is_file():
+                archives.append(f)
+        return images, archives
+
+    def _estimate_archive_members(self, archives: List[Path]) -> int:
+        """Count archive images from cached indexes; uncached archives count as one."""
+        total = 0
+        for archive in archives:
+            members = self.archive_reader.cached_members(archive)
+            total += len(members) if members is not None else 1
+        return total
+
+    def _scan_archives(self, archives: List[Path], files_processed: int, total_files: int,
+                       started: float) -> bool:
+        """
+        Stream and hash the images inside each archive.
+
+        :return: False if the scan was cancelled
+        """
+        throttle = self.throttle
+        for archive in archives:
+            if self._cancel_callback and self._cancel_callback():
+                return False
+            try:
+                for member_path, data in self.archive_reader.iter_images(archive):
+                    if throttle and not throttle.acquire(len(data), self._cancel_callback):
+                        return False
+                    self.scan_stats.bytes_read += len(data)
+                    hash_val = self.compute_match_key(member_path, data)
+                    if hash_val:
+                        self.image_hashes[hash_val].append(member_path)
+                        self._path_hashes[member_path] = hash_val
+
+                    files_processed += 1
+                    self.scan_stats.files = files_processed
+                    self.scan_stats.elapsed = time.perf_counter() - started
+                    if self._progress_callback:
+                        self._progress_callback(min(1.0, files_processed / total_files))
+            except Exception as e:
+                self.errors.append(f"Error reading archive {archive}: {e}")
+        return True
+
+    def choose_keeper(self, group: ImageGroup) -> Path:
+        """
+        Return the image in the group that survives deletion.
+
+        Archive members are never deleted, so one is only kept when the
+        group has no loose files; otherwise every loose copy would be lost.
+        """
+        candidates = group.paths
+        if self.archive_reader:
+            loose = [p for p in group.paths if not ArchiveReader.split_member_path(p)]
+            candidates = loose or group.paths
+        if self.keep_policy is None:
+            return candidates[0]
+        return self.keep_policy.choose(candidates, self.signatures)
+
     def delete_duplicates(self, duplicates: List[ImageGroup], keep_original: bool = True) -> List[Path]:
         """
         Delete duplicate images.
         
         :param duplicates: List of ImageGroup containing duplicate images
-        :param keep_original: If True, keep the first image in each group
+        :param keep_original: If True, keep one image in each group, chosen by keep_policy
         :return: List of deleted image paths
         """
         deleted_paths: List[Path] = []
         
         for group in duplicates:
-            # If keep_original is True, keep the first image in the group
-            images_to_delete = group.paths[1:] if keep_original else group.paths
+            if keep_original:
+                keeper = self.choose_keeper(group)
+                images_to_delete = [p for p in group.paths if p != keeper]
+            else:
+                images_to_delete = group.paths
             
             for image_path in images_to_delete:
                 try:
@@ -161,9 +583,15 @@ class ImageFinder:
                     if self._cancel_callback and self._cancel_callback():
                         break
                     
+                    if self.archive_reader and ArchiveReader.split_member_path(image_path):
+                        self.errors.append(f"Not deleting {image_path}: files inside archives are left untouched")
+                        continue
+                    
                     # Delete the file
                     image_path.unlink()
                     deleted_paths.append(image_path)
+                    # Keep the index live for watch mode and the query server
+                    self.remove_image(image_path)
                 except Exception as e:
                     self.errors.append(f"Error deleting {image_path}: {e}")
         
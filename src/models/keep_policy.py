@@ -0,0 +1,162 @@
+"""
+Policies for choosing which copy in a duplicate group survives deletion.
+"""
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from PIL import Image
+
+# Pillow plugin to try first for each extension, avoids probing every plugin
+_FORMAT_HINTS = {
+    '.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.gif': 'GIF', '.bmp': 'BMP',
+    '.tif': 'TIFF', '.tiff': 'TIFF', '.heic': 'HEIF', '.heif': 'HEIF',
+}
+
+# Default format preference, most preferred first: originals before exports
+DEFAULT_FORMAT_PREFERENCE = ('HEIF', 'HEIC', 'TIFF', 'PNG', 'BMP', 'JPEG', 'GIF')
+
+
+class ImageMetadata:
+    """
+    Cheap, lazily loaded facts about an image file.
+
+    ``stat`` is called at most once, and the image header is only read
+    (never decoded) the first time dimensions or format are requested.
+    """
+
+    def __init__(self, path: Path, signature: Any = None):
+        self.path = path
+        self._signature = signature
+        self._stat: Optional[os.stat_result] = None
+        self._header: Optional[Tuple[int, int, Optional[str]]] = None
+
+    @property
+    def stat(self) -> Optional[os.stat_result]:
+        if self._stat is None:
+            try:
+                self._stat = self.path.stat()
+            except OSError:
+                return None
+        return self._stat
+
+    @property
+    def header(self) -> Tuple[int, int, Optional[str]]:
+        """Return (width, height, format) from the image header."""
+        if self._header is None:
+            if self._signature is not None:
+                sig = self._signature
+                self._header = (sig.width, sig.height, sig.format)
+            else:
+                self._header = self._read_header()
+        return self._header
+
+    def _read_header(self) -> Tuple[int, int, Optional[str]]:
+        """Open the image lazily, which parses the header without decoding."""
+        hint = _FORMAT_HINTS.get(self.path.suffix.lower())
+        for formats in ([hint], None) if hint else (None,):
+            try:
+                with Image.open(self.path, formats=formats) as img:
+                    return (img.width, img.height, img.format)
+            except Exception:
+                continue
+        return (0, 0, None)
+
+    @property
+    def pixels(self) -> int:
+        width, height, _ = self.header
+        return width * height
+
+    @property
+    def format(self) -> str:
+        """Return the header format, falling back to the file extension."""
+        fmt = self.header[2]
+        return (fmt or self.path.suffix.lstrip('.')).upper()
+
+
+class KeepPolicy:
+    """
+    Rank the copies in a duplicate group and pick the one to keep.
+
+    Criteria are applied in order, each breaking ties left by the previous
+    one; remaining ties keep the earliest path in the group. Available
+    criteria:
+
+    - ``resolution``: most pixels
+    - ``size``: largest file
+    - ``oldest``: earliest modification time
+    - ``newest``: latest modification time
+    - ``prefix``: path under the earliest matching ``preferred_prefixes`` entry
+    - ``format``: earliest format in ``format_preference``
+    - ``first``: first path in the group (the historic behaviour)
+    """
+
+    CRITERIA = ('resolution', 'size', 'oldest', 'newest', 'prefix', 'format', 'first')
+
+    def __init__(
+            self,
+            criteria: Sequence[str] = ('first',),
+            preferred_prefixes: Sequence[str] = (),
+            format_preference: Sequence[str] = DEFAULT_FORMAT_PREFERENCE
+        ):
+        unknown = [c for c in criteria if c not in self.CRITERIA]
+        if unknown:
+            raise ValueError(f"Unknown keep criteria {unknown}, expected any of {self.CRITERIA}")
+        self.criteria = list(criteria)
+        self.preferred_prefixes = [Path(p).expanduser().resolve() for p in preferred_prefixes]
+        self.format_preference = [f.upper().lstrip('.') for f in format_preference]
+        self._keys: Dict[str, Callable[[ImageMetadata], Any]] = {
+            'resolution': lambda m: -m.pixels,
+            'size': lambda m: -(m.stat.st_size if m.stat else 0),
+            'oldest': lambda m: m.stat.st_mtime if m.stat else float('inf'),
+            'newest': lambda m: -(m.stat.st_mtime if m.stat else float('-inf')),
+            'prefix': self._prefix_rank,
+            'format': self._format_rank,
+            'first': lambda m: 0,
+        }
+
+    @classmethod
+    def from_spec(cls, spec: str, preferred_prefixes: Sequence[str] = (),
+                  format_preference: Optional[Sequence[str]] = None) -> 'KeepPolicy':
+        """Build a policy from a comma separated list of criteria, e.g. ``"resolution,oldest"``."""
+        criteria = [c.strip() for c in spec.split(',') if c.strip()]
+        return cls(criteria or ['first'], preferred_prefixes,
+                   format_preference or DEFAULT_FORMAT_PREFERENCE)
+
+    def choose(self, paths: List[Path], signatures: Optional[Dict[Path, Any]] = None) -> Path:
+        """
+        Return the path to keep.
+
+        :param paths: Paths in one duplicate group
+        :param signatures: Optional ImageSignature lookup, used instead of reading headers
+        """
+        signatures = signatures or {}
+        candidates = [ImageMetadata(path, signatures.get(path)) for path in paths]
+        # Narrow criterion by criterion so later (costlier) criteria only see ties
+        for criterion in self.criteria:
+            if len(candidates) == 1:
+                break
+            key = self._keys[criterion]
+            keys = [key(meta) for meta in candidates]
+            best = min(keys)
+            candidates = [meta for meta, k in zip(candidates, keys) if k == best]
+        return candidates[0].path
+
+    def _prefix_rank(self, meta: ImageMetadata) -> int:
+        # Resolve like the prefixes so symlinked folders compare equal
+        try:
+            path = meta.path.resolve()
+        except (OSError, RuntimeError):
+            path = meta.path.absolute()
+        for rank, prefix in enumerate(self.preferred_prefixes):
+            if path == prefix or prefix in path.parents:
+                return rank
+        return len(self.preferred_prefixes)
+
+    def _format_rank(self, meta: ImageMetadata) -> int:
+        fmt = meta.format
+        aliases = {'JPG': 'JPEG', 'TIF': 'TIFF'}
+        fmt = aliases.get(fmt, fmt)
+        try:
+            return self.format_preference.index(fmt)
+        except ValueError:
+            return len(self.format_preference)
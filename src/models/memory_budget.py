@@ -0,0 +1,90 @@
+"""
+Global memory budget for image decoding across scanner threads.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from PIL import Image
+
+# Bytes per pixel of Pillow's in-memory storage for each mode
+_MODE_BYTES = {
+    '1': 1, 'L': 1, 'P': 1, 'LA': 4, 'PA': 4, 'La': 4,
+    'I': 4, 'F': 4, 'I;16': 2, 'I;16L': 2, 'I;16B': 2, 'I;16N': 2,
+}
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when an image is too large to decode under the configured budget."""
+
+
+def estimate_decode_bytes(img: Image.Image, copies: int = 1) -> int:
+    """
+    Estimate the memory needed to decode an opened (not yet loaded) image.
+
+    Only header fields are used, so this is cheap to call before decoding.
+
+    :param img: Lazily opened image
+    :param copies: Number of full-size buffers the caller will hold at once
+    :return: Estimated peak bytes
+    """
+    pixels = img.width * img.height
+    decoded = pixels * _MODE_BYTES.get(img.mode, 4)  # Multi-band modes are stored as 4 bytes
+    grayscale = 0 if img.mode == 'L' else pixels  # convert('L') copy used for hashing
+    return decoded * copies + grayscale
+
+
+class MemoryBudget:
+    """
+    Shared byte budget that decoders reserve before loading an image.
+
+    Reservations block until enough of the budget is free. Images whose
+    estimate exceeds the whole budget are run through a single exclusive
+    slot: they wait until nothing else is decoding and then block all other
+    decodes until they finish. Images above ``max_image_bytes`` are refused.
+    With a ``limit_bytes`` of None only that per-image cap is enforced.
+    """
+
+    def __init__(
+            self,
+            limit_bytes: Optional[int],
+            large_image_bytes: Optional[int] = None,
+            max_image_bytes: Optional[int] = None
+        ):
+        self.limit_bytes = limit_bytes
+        # Above this estimate a reduced decode is attempted where the format allows it
+        self.large_image_bytes = large_image_bytes or (limit_bytes // 4 if limit_bytes else None)
+        self.max_image_bytes = max_image_bytes
+        self.in_use = 0
+        self.peak = 0
+        self._exclusive = False
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        """Hold nbytes of the budget for the duration of the block."""
+        if self.max_image_bytes is not None and nbytes > self.max_image_bytes:
+            raise MemoryBudgetExceeded(
+                f"needs ~{nbytes // (1024 * 1024)} MB, limit is {self.max_image_bytes // (1024 * 1024)} MB")
+
+        if self.limit_bytes is None:
+            yield
+            return
+
+        exclusive = nbytes > self.limit_bytes
+        with self._cond:
+            if exclusive:
+                self._cond.wait_for(lambda: self.in_use == 0 and not self._exclusive)
+                self._exclusive = True
+            else:
+                self._cond.wait_for(
+                    lambda: not self._exclusive and self.in_use + nbytes <= self.limit_bytes)
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_use -= nbytes
+                if exclusive:
+                    self._exclusive = False
+                self._cond.notify_all()
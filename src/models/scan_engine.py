@@ -0,0 +1,249 @@
+"""
+Parallel scanning engine with separate reader and decoder pools.
+"""
+import os
+import math
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+class WorkerAutotuner:
+    """
+    Choose reader and decoder pool sizes from runtime measurements.
+
+    Decoders are grown one at a time while each step improves files/sec, up
+    to the CPU ceiling; a step that costs more than ``TOLERANCE`` of the best
+    throughput is reverted and the decoder count frozen. Readers follow the
+    measured read/decode time ratio so the decoders are never starved, which
+    gives few readers on local NVMe and many on high-latency NFS mounts.
+    """
+
+    WINDOW_SECONDS = 1.0
+    MIN_WINDOW_FILES = 8
+    TOLERANCE = 0.05
+
+    def __init__(self, max_readers: int, max_decoders: int, readers: int = 2, decoders: int = 1):
+        self.max_readers = max_readers
+        self.max_decoders = max_decoders
+        self.readers = max(1, min(readers, max_readers))
+        self.decoders = max(1, min(decoders, max_decoders))
+        self._best = 0.0
+        self._last_step = 0
+        self._frozen = False
+        self._window_start = time.perf_counter()
+        self._window_files = 0
+        self._read_time = 0.0
+        self._decode_time = 0.0
+        self._samples = 0
+
+    def record(self, read_seconds: float, decode_seconds: float) -> bool:
+        """
+        Record one processed file and re-tune at the end of a window.
+
+        :return: True if the pool sizes changed
+        """
+        self._window_files += 1
+        self._read_time += read_seconds
+        self._decode_time += decode_seconds
+        self._samples += 1
+
+        elapsed = time.perf_counter() - self._window_start
+        if elapsed < self.WINDOW_SECONDS or self._window_files < self.MIN_WINDOW_FILES:
+            return False
+        throughput = self._window_files / elapsed
+        self._window_start = time.perf_counter()
+        self._window_files = 0
+        return self._adjust(throughput)
+
+    def _adjust(self, throughput: float) -> bool:
+        """Hill-climb the decoder count and size readers from the time ratio."""
+        before = (self.readers, self.decoders)
+
+        if self._last_step and throughput < self._best * (1 - self.TOLERANCE):
+            # Last step hurt; undo it once and stop exploring
+            self.decoders = max(1, self.decoders - self._last_step)
+            self._last_step = 0
+            self._frozen = True
+        else:
+            self._best = max(self._best, throughput)
+            if not self._frozen and self.decoders < self.max_decoders:
+                self.decoders += 1
+                self._last_step = 1
+            else:
+                self._last_step = 0
+
+        avg_read = self._read_time / self._samples
+        avg_decode = self._decode_time / self._samples
+        wanted = math.ceil(self.decoders * avg_read / max(avg_decode, 1e-6))
+        self.readers = max(1, min(self.max_readers, wanted))
+        return (self.readers, self.decoders) != before
+
+
+class ScanEngine:
+    """
+    Hash files with a pool of reader threads feeding a pool of decoder threads.
+
+    Readers only read file bytes, decoders only hash them, so slow storage
+    and slow decoding are parallelised independently. Pillow releases the
+    GIL while decoding, so decoder threads scale across cores. Bytes waiting
+    between the two pools are capped by ``max_buffered_bytes``.
+    """
+
+    DEFAULT_READERS = 2
+    MAX_READERS = 32
+    MAX_BUFFERED_BYTES = 256 * 1024 * 1024
+
+    def __init__(
+            self,
+            finder,
+            readers: Optional[int] = None,
+            decoders: Optional[int] = None,
+            autotune: bool = True,
+            max_buffered_bytes: int = MAX_BUFFERED_BYTES
+        ):
+        for name, count in (('readers', readers), ('decoders', decoders)):
+            if count is not None and count < 1:
+                raise ValueError(f"{name} must be at least 1, got {count}")
+        self.finder = finder
+        cpus = os.cpu_count() or 1
+        if autotune:
+            max_readers, max_decoders = self.MAX_READERS, cpus
+        else:
+            max_readers, max_decoders = readers or self.DEFAULT_READERS, decoders or cpus
+        self.autotuner: Optional[WorkerAutotuner] = None
+        if autotune:
+            self.autotuner = WorkerAutotuner(max_readers, max_decoders,
+                                             readers=readers or 2, decoders=decoders or 1)
+        self.max_readers = max_readers
+        self.max_decoders = max_decoders
+        self.readers = self.autotuner.readers if autotune else max_readers
+        self.decoders = self.autotuner.decoders if autotune else max_decoders
+        self.max_buffered_bytes = max_buffered_bytes
+
+        self._lock = threading.Condition()
+        self._queue: "queue.Queue[Tuple[int, Path, bytes, float]]" = queue.Queue()
+        self._next_index = 0
+        self._processed = 0
+        self._buffered = 0
+        self._stop = threading.Event()
+
+    def run(self, files: List[Path]) -> List[Optional[str]]:
+        """
+        Hash every file and return the match keys in the order of files.
+
+        Returns early (with None for unprocessed files) if the finder's
+        cancel callback fires.
+        """
+        self._files = files
+        self._results: List[Optional[str]] = [None] * len(files)
+        self._started = time.perf_counter()
+
+        threads = [
+            threading.Thread(target=self._reader, args=(i,), daemon=True)
+            for i in range(self.max_readers)
+        ] + [
+            threading.Thread(target=self._decoder, args=(i,), daemon=True)
+            for i in range(self.max_decoders)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._results
+
+    def _cancelled(self) -> bool:
+        callback = self.finder._cancel_callback
+        if callback and callback():
+            self._stop.set()
+        return self._stop.is_set()
+
+    def _reader(self, slot: int) -> None:
+        """Read file bytes while this slot is within the active reader count."""
+        stats = self.finder.scan_stats
+        scheduler = self.finder.io_scheduler
+        throttle = self.finder.throttle
+        if throttle:
+            self.finder._enter_throttled_worker()
+        while not self._cancelled():
+            with self._lock:
+                if self._next_index >= len(self._files):
+                    return
+                if slot >= self.readers or self._buffered >= self.max_buffered_bytes:
+                    self._lock.wait(0.05)
+                    continue
+                index = self._next_index
+                self._next_index += 1
+                if scheduler:
+                    scheduler.on_file_start(index)
+
+            file = self._files[index]
+            if throttle:
+                try:
+                    size = file.stat().st_size
+                except OSError:
+                    size = 0
+                if not throttle.acquire(size, self._cancelled):
+                    return
+            start = time.perf_counter()
+            try:
+                data = file.read_bytes()
+            except OSError as e:
+                self.finder.errors.append(f"Error reading {file}: {e}")
+                data = b''
+            read_seconds = time.perf_counter() - start
+
+            with self._lock:
+                self._buffered += len(data)
+                stats.bytes_read += len(data)
+                stats.read_seconds += read_seconds
+            self._queue.put((index, file, data, read_seconds))
+
+    def _decoder(self, slot: int) -> None:
+        """Hash queued files while this slot is within the active decoder count."""
+        stats = self.finder.scan_stats
+        scheduler = self.finder.io_scheduler
+        progress = self.finder._progress_callback
+        total = len(self._files)
+        if self.finder.throttle:
+            self.finder._enter_throttled_worker()
+        while not self._cancelled():
+            with self._lock:
+                if self._processed >= total:
+                    self._lock.notify_all()
+                    return
+                if slot >= self.decoders:
+                    self._lock.wait(0.05)
+                    continue
+            try:
+                index, file, data, read_seconds = self._queue.get(timeout=0.05)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            if data:
+                try:
+                    self._results[index] = self.finder.compute_match_key(file, data)
+                except Exception as e:
+                    self.finder.errors.append(f"Error processing {file}: {e}")
+            decode_seconds = time.perf_counter() - start
+            if scheduler:
+                scheduler.on_file_done(file)
+
+            with self._lock:
+                self._buffered -= len(data)
+                self._processed += 1
+                processed = self._processed
+                stats.files = processed
+                stats.decode_seconds += decode_seconds
+                stats.elapsed = time.perf_counter() - self._started
+                if self.autotuner and self.autotuner.record(read_seconds, decode_seconds):
+                    self.readers = self.autotuner.readers
+                    self.decoders = self.autotuner.decoders
+                stats.readers = self.readers
+                stats.decoders = self.decoders
+                self._lock.notify_all()
+            if progress:
+                progress(min(1.0, processed / total))
@@ -0,0 +1,187 @@
+"""
+Bandwidth, file rate and priority limits for background scans.
+"""
+import os
+import sys
+import time
+import ctypes
+import platform
+import threading
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+# ioprio_set(2) syscall numbers and constants
+_SYS_IOPRIO_SET = {'x86_64': 251, 'aarch64': 30, 'i386': 289, 'i686': 289, 'armv7l': 314}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+# Process-wide niceness is lowered at most once where threads cannot be targeted
+_process_nice_lock = threading.Lock()
+_process_niced = False
+
+
+def lower_thread_priority(nice: int = 10, idle_io: bool = True) -> Optional[str]:
+    """
+    Lower the CPU and I/O priority of the calling thread.
+
+    On Linux both ``setpriority`` and ``ioprio_set`` accept a thread id, so
+    only the scanning thread is affected, not the GUI. Elsewhere only the
+    CPU niceness of the whole process can be lowered, so it is done once
+    per process rather than compounding with every scan thread.
+
+    :return: An error message if a priority could not be changed
+    """
+    errors = []
+    if sys.platform.startswith('linux'):
+        tid = threading.get_native_id()
+        try:
+            current = os.getpriority(os.PRIO_PROCESS, tid)
+            os.setpriority(os.PRIO_PROCESS, tid, min(19, max(current, nice)))
+        except OSError as e:
+            errors.append(f"nice: {e}")
+
+        syscall = _SYS_IOPRIO_SET.get(platform.machine())
+        if syscall is not None:
+            ioprio = (IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) if idle_io else \
+                ((IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | 7)
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.syscall(syscall, IOPRIO_WHO_PROCESS, tid, ioprio) != 0:
+                errors.append(f"ioprio: {os.strerror(ctypes.get_errno())}")
+    elif hasattr(os, 'nice'):
+        global _process_niced
+        with _process_nice_lock:
+            if not _process_niced:
+                _process_niced = True
+                try:
+                    os.nice(nice)
+                except OSError as e:
+                    errors.append(f"nice: {e}")
+    return "; ".join(errors) or None
+
+
+class ScanThrottle:
+    """
+    Token-bucket limits on bytes read and files processed per second.
+
+    Limits of ``None`` mean unlimited and can be changed while a scan is
+    running with set_limits(). Workers call acquire() before each read; it
+    sleeps in short slices so new limits and cancellation take effect
+    promptly. Recent effective throughput is available from throughput().
+    """
+
+    BURST_SECONDS = 1.0
+    WINDOW_SECONDS = 5.0
+    SLEEP_SLICE = 0.1
+
+    def __init__(
+            self,
+            bytes_per_second: Optional[float] = None,
+            files_per_second: Optional[float] = None,
+            low_priority: bool = False
+        ):
+        self.low_priority = low_priority
+        self._lock = threading.Lock()
+        self._bytes_per_second = self._check_limit('bytes_per_second', bytes_per_second)
+        self._files_per_second = self._check_limit('files_per_second', files_per_second)
+        self._byte_tokens = 0.0
+        self._file_tokens = 0.0
+        self._refilled = time.monotonic()
+        self._history: Deque[Tuple[float, int]] = deque()
+        self._prioritised = threading.local()
+
+    @property
+    def bytes_per_second(self) -> Optional[float]:
+        return self._bytes_per_second
+
+    @property
+    def files_per_second(self) -> Optional[float]:
+        return self._files_per_second
+
+    def set_limits(self, bytes_per_second: Optional[float] = None,
+                   files_per_second: Optional[float] = None) -> None:
+        """Change both limits; None (or 0) removes a limit."""
+        bytes_per_second = self._check_limit('bytes_per_second', bytes_per_second)
+        files_per_second = self._check_limit('files_per_second', files_per_second)
+        with self._lock:
+            self._refill()
+            self._bytes_per_second = bytes_per_second
+            self._files_per_second = files_per_second
+
+    @staticmethod
+    def _check_limit(name: str, value: Optional[float]) -> Optional[float]:
+        """Normalise 0 to None and reject negative limits, which would never refill."""
+        if not value:
+            return None
+        if not value > 0:
+            raise ValueError(f"{name} must be positive, got {value}")
+        return value
+
+    def enter_worker(self) -> Optional[str]:
+        """Lower the calling thread's priority once if low_priority is set."""
+        if not self.low_priority or getattr(self._prioritised, 'done', False):
+            return None
+        self._prioritised.done = True
+        return lower_thread_priority()
+
+    def acquire(self, nbytes: int, cancelled: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Block until one file of nbytes may be read.
+
+        :return: False if cancelled while waiting
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                byte_ok = self._bytes_per_second is None or self._byte_tokens > 0
+                file_ok = self._files_per_second is None or self._file_tokens >= 1
+                if byte_ok and file_ok:
+                    # Large files may overdraw the byte bucket; later reads repay the debt
+                    if self._bytes_per_second is not None:
+                        self._byte_tokens -= nbytes
+                    if self._files_per_second is not None:
+                        self._file_tokens -= 1
+                    now = time.monotonic()
+                    self._history.append((now, nbytes))
+                    self._trim(now)
+                    return True
+                wait = self._wait_time()
+            if cancelled and cancelled():
+                return False
+            time.sleep(min(self.SLEEP_SLICE, wait))
+
+    def throughput(self) -> Tuple[float, float]:
+        """Return recent effective (bytes/sec, files/sec)."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if not self._history:
+                return 0.0, 0.0
+            span = max(now - self._history[0][0], self.SLEEP_SLICE)
+            total = sum(n for _, n in self._history)
+            return total / span, len(self._history) / span
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._refilled
+        self._refilled = now
+        if self._bytes_per_second is not None:
+            self._byte_tokens = min(self._bytes_per_second * self.BURST_SECONDS,
+                                    self._byte_tokens + elapsed * self._bytes_per_second)
+        if self._files_per_second is not None:
+            self._file_tokens = min(max(1.0, self._files_per_second * self.BURST_SECONDS),
+                                    self._file_tokens + elapsed * self._files_per_second)
+
+    def _wait_time(self) -> float:
+        """Seconds until the emptier bucket has refilled enough."""
+        waits = [0.0]
+        if self._bytes_per_second is not None and self._byte_tokens <= 0:
+            waits.append((-self._byte_tokens + 1) / self._bytes_per_second)
+        if self._files_per_second is not None and self._file_tokens < 1:
+            waits.append((1 - self._file_tokens) / self._files_per_second)
+        return max(waits)
+
+    def _trim(self, now: float) -> None:
+        while self._history and now - self._history[0][0] > self.WINDOW_SECONDS:
+            self._history.popleft()
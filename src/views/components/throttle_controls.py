@@ -0,0 +1,88 @@
+"""
+Background scan throttle controls component.
+"""
+import customtkinter as ctk
+from typing import Optional, Callable
+
+class ThrottleControls(ctk.CTkFrame):
+    """Component for background mode, bandwidth and file rate limits."""
+
+    MAX_MBPS = 200
+    MAX_FILES_PER_SEC = 500
+
+    def __init__(
+            self,
+            master,
+            on_change: Optional[Callable[[bool, Optional[float], Optional[float]], None]] = None
+        ):
+        super().__init__(master)
+        self.on_change = on_change
+        self._setup_ui()
+
+    def _setup_ui(self):
+        """Setup the UI components."""
+        self.background_var = ctk.BooleanVar(value=False)
+        self.background_check = ctk.CTkCheckBox(
+            self,
+            text="Background mode",
+            variable=self.background_var,
+            command=self._handle_change
+        )
+        self.background_check.pack(side="left", padx=5)
+
+        self.mbps_label = ctk.CTkLabel(self, text="Read: unlimited", width=130)
+        self.mbps_label.pack(side="left", padx=5)
+        self.mbps_slider = ctk.CTkSlider(
+            self,
+            from_=0,
+            to=self.MAX_MBPS,
+            number_of_steps=self.MAX_MBPS,
+            width=120,
+            command=lambda _: self._handle_change()
+        )
+        self.mbps_slider.set(0)
+        self.mbps_slider.pack(side="left", padx=5)
+
+        self.files_label = ctk.CTkLabel(self, text="Files: unlimited", width=130)
+        self.files_label.pack(side="left", padx=5)
+        self.files_slider = ctk.CTkSlider(
+            self,
+            from_=0,
+            to=self.MAX_FILES_PER_SEC,
+            number_of_steps=self.MAX_FILES_PER_SEC,
+            width=120,
+            command=lambda _: self._handle_change()
+        )
+        self.files_slider.set(0)
+        self.files_slider.pack(side="left", padx=5)
+
+        self.throughput_label = ctk.CTkLabel(self, text="")
+        self.throughput_label.pack(side="left", padx=10)
+        self._set_sliders_state()
+
+    def _set_sliders_state(self):
+        """Limits only apply in background mode."""
+        state = "normal" if self.background_var.get() else "disabled"
+        self.mbps_slider.configure(state=state)
+        self.files_slider.configure(state=state)
+
+    def _handle_change(self):
+        """Handle a change to any control."""
+        self._set_sliders_state()
+        enabled = self.background_var.get()
+        mbps = int(self.mbps_slider.get()) or None
+        files = int(self.files_slider.get()) or None
+        self.mbps_label.configure(text=f"Read: {mbps} MB/s" if mbps else "Read: unlimited")
+        self.files_label.configure(text=f"Files: {files}/s" if files else "Files: unlimited")
+        if self.on_change:
+            self.on_change(enabled, mbps if enabled else None, files if enabled else None)
+
+    def set_throughput(self, mb_per_second: float, files_per_second: float):
+        """Show the effective throughput."""
+        self.throughput_label.configure(
+            text=f"{mb_per_second:.1f} MB/s, {files_per_second:.1f} files/s"
+        )
+
+    def clear_throughput(self):
+        """Hide the throughput readout."""
+        self.throughput_label.configure(text="")
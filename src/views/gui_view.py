@@ -8,6 +8,7 @@ from typing import List, Optional, Callable
 from .components.folder_selector import FolderSelector
 from .components.action_buttons import ActionButtons
 from .components.results_display import ResultsDisplay
+from .components.throttle_controls import ThrottleControls
 from ..models.image_finder import ImageGroup
 
 class DuplicateFinderView:
@@ -23,6 +24,7 @@ class DuplicateFinderView:
         self.on_scan_start: Optional[Callable[[], None]] = None
         self.on_delete: Optional[Callable[[], None]] = None
         self.on_cancel: Optional[Callable[[], None]] = None
+        self.on_throttle_change: Optional[Callable[[bool, Optional[float], Optional[float]], None]] = None
         
         self._setup_gui()
 
@@ -44,6 +46,13 @@ class DuplicateFinderView:
         self.progress_bar.pack(pady=10, padx=20, fill="x")
         self.progress_bar.set(0)
         
+        # Background mode and throughput limits
+        self.throttle_controls = ThrottleControls(
+            self.window,
+            on_change=self._on_throttle_change
+        )
+        self.throttle_controls.pack(pady=(0, 10), padx=20, fill="x")
+        
         # Results display
         self.results_display = ResultsDisplay(self.window)
         self.results_display.pack(pady=10, padx=20, fill="both", expand=True)
@@ -77,6 +86,11 @@ class DuplicateFinderView:
         if self.on_cancel:
             self.on_cancel()
 
+    def _on_throttle_change(self, enabled: bool, mbps: Optional[float], files_per_second: Optional[float]):
+        """Handle a change to the throttle controls."""
+        if self.on_throttle_change:
+            self.on_throttle_change(enabled, mbps, files_per_second)
+
     def get_folder_path(self) -> str:
         """Get the current folder path."""
         return self.folder_selector.get_path()
@@ -98,6 +112,14 @@ class DuplicateFinderView:
         self.progress_var.set(value)
         self.window.update_idletasks()
 
+    def update_throughput(self, mb_per_second: float, files_per_second: float):
+        """Show the effective scan throughput."""
+        self.throttle_controls.set_throughput(mb_per_second, files_per_second)
+
+    def clear_throughput(self):
+        """Hide the scan throughput readout."""
+        self.throttle_controls.clear_throughput()
+
     def show_error(self, message: str):
         """Display an error message."""
         self.results_display.show_error(message)
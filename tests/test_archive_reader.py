@@ -0,0 +1,73 @@
+"""
+Tests for streaming images out of zip and tar archives.
+"""
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from src.models import archive_reader
+from src.models.archive_reader import ArchiveReader
+
+MEMBERS = {'a.png': b'first', 'dir/b.jpg': b'second', 'notes.txt': b'skipped'}
+
+
+def make_archive(path):
+    if path.name.endswith('.zip'):
+        with zipfile.ZipFile(path, 'w') as zf:
+            for name, data in MEMBERS.items():
+                zf.writestr(name, data)
+        return
+    with tarfile.open(path, 'w:' + path.name.rsplit('.', 1)[-1].replace('tar', '')) as tf:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+
+def make_reader(tmp_path):
+    return ArchiveReader(lambda p: p.suffix in ('.png', '.jpg'), cache_dir=tmp_path / 'cache')
+
+
+@pytest.fixture(params=['photos.zip', 'photos.tar', 'photos.tar.gz', 'photos.tar.bz2', 'photos.tar.xz'])
+def archive(request, tmp_path):
+    path = tmp_path / request.param
+    make_archive(path)
+    return path
+
+
+def test_iter_images_streams_only_images(archive, tmp_path):
+    reader = make_reader(tmp_path)
+    images = dict(reader.iter_images(archive))
+
+    assert images == {
+        ArchiveReader.member_path(archive, 'a.png'): b'first',
+        ArchiveReader.member_path(archive, 'dir/b.jpg'): b'second',
+    }
+    # The member index is recorded during the same pass and cached on disk
+    assert [m.name for m in make_reader(tmp_path).cached_members(archive)] == ['a.png', 'dir/b.jpg']
+
+
+def test_read_member_by_virtual_path(archive, tmp_path):
+    reader = make_reader(tmp_path)
+    path = ArchiveReader.member_path(archive, 'dir/b.jpg')
+    assert ArchiveReader.split_member_path(path) == (archive, 'dir/b.jpg')
+    assert reader.read_member(path) == b'second'
+    with pytest.raises(FileNotFoundError):
+        reader.read_member(archive.parent / 'loose.png')
+
+
+def test_read_members_opens_a_compressed_tar_once(tmp_path, monkeypatch):
+    archive = tmp_path / 'photos.tar.gz'
+    make_archive(archive)
+    opens = []
+    real_open = tarfile.open
+    monkeypatch.setattr(archive_reader.tarfile, 'open',
+                        lambda *args, **kwargs: opens.append(args) or real_open(*args, **kwargs))
+
+    paths = [ArchiveReader.member_path(archive, name) for name in ('a.png', 'dir/b.jpg')]
+    data = make_reader(tmp_path).read_members(paths + [tmp_path / 'loose.png'])
+
+    assert data == {paths[0]: b'first', paths[1]: b'second'}
+    assert len(opens) == 1
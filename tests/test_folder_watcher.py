@@ -0,0 +1,104 @@
+"""
+Tests for the folder watcher keeping an ImageFinder index live.
+"""
+import os
+import sys
+import time
+
+import pytest
+from PIL import Image
+
+from src.models.image_finder import ImageFinder
+from src.models.folder_watcher import FolderWatcher, _Inotify
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="inotify is Linux only")
+
+
+def save_image(path, pattern):
+    # Solid colours share an average hash, so vary the structure instead
+    img = Image.new('L', (32, 32), 0)
+    img.paste(255, (0, 0, 32, 16) if pattern == 'top' else (0, 0, 16, 32))
+    img.save(path)
+
+
+@pytest.fixture
+def watched(tmp_path):
+    save_image(tmp_path / 'a.png', 'top')
+    save_image(tmp_path / 'b.png', 'top')
+    save_image(tmp_path / 'c.png', 'left')
+    finder = ImageFinder()
+    finder.find_duplicates(tmp_path)
+    events = []
+    watcher = FolderWatcher(finder, tmp_path, lambda path, group: events.append(path))
+    watcher._inotify = _Inotify()
+    watcher._watch_tree(tmp_path)
+    watcher._snapshot = watcher._take_snapshot()
+    yield watcher, finder, events
+    watcher._close_inotify()
+
+
+def test_overflow_only_rehashes_changed_files(watched, tmp_path):
+    watcher, finder, events = watched
+    hashed = []
+    add_image = finder.add_image
+    finder.add_image = lambda path: hashed.append(path) or add_image(path)
+
+    save_image(tmp_path / 'c.png', 'top')
+    os.utime(tmp_path / 'c.png', ns=(0, 0))
+    watcher._reconcile()
+    watcher.flush()
+
+    assert hashed == [tmp_path / 'c.png']
+    assert events == [tmp_path / 'c.png']  # a.png/b.png are not reported again
+
+
+def test_overflow_removes_deleted_files(watched, tmp_path):
+    watcher, finder, events = watched
+    (tmp_path / 'b.png').unlink()
+    watcher._snapshot.pop(tmp_path / 'b.png')  # The delete event was lost
+    watcher._reconcile()
+    watcher.flush()
+
+    assert tmp_path / 'b.png' not in finder._path_hashes
+    assert finder.get_duplicate_groups() == []
+
+
+def test_overflow_watches_new_directories(watched, tmp_path):
+    watcher, finder, events = watched
+    (tmp_path / 'new').mkdir()
+    watcher._reconcile()
+
+    assert tmp_path / 'new' in watcher._watches.values()
+
+
+def test_deleted_duplicates_are_not_reported_by_the_watcher(tmp_path):
+    save_image(tmp_path / 'a.png', 'top')
+    save_image(tmp_path / 'b.png', 'top')
+    finder = ImageFinder()
+    assert finder.delete_duplicates(finder.find_duplicates(tmp_path)) == [tmp_path / 'b.png']
+
+    events = []
+    watcher = FolderWatcher(finder, tmp_path, lambda path, group: events.append(group.paths))
+    save_image(tmp_path / 'c.png', 'top')
+    watcher._queue(tmp_path / 'c.png', True)
+    watcher.flush()
+
+    assert events == [[tmp_path / 'a.png', tmp_path / 'c.png']]
+
+
+def test_steady_trickle_is_flushed_within_max_latency(tmp_path):
+    save_image(tmp_path / 'a.png', 'top')
+    finder = ImageFinder()
+    finder.find_duplicates(tmp_path)
+    events = []
+    watcher = FolderWatcher(finder, tmp_path, lambda path, group: events.append(path),
+                            debounce=0.2, max_latency=0.3)
+
+    # A new copy every 0.1s never lets the folder go quiet for the debounce
+    for i in range(6):
+        save_image(tmp_path / f'copy{i}.png', 'top')
+        watcher._queue(tmp_path / f'copy{i}.png', True)
+        watcher._maybe_flush()
+        time.sleep(0.1)
+
+    assert tmp_path / 'copy0.png' in events
@@ -0,0 +1,58 @@
+"""
+Tests for pixel verification of candidate duplicate groups.
+"""
+import tarfile
+
+from PIL import Image
+
+from src.models.image_finder import ImageFinder
+from src.models.group_verifier import GroupVerifier
+
+
+def test_cancel_during_verification_returns_no_groups(tmp_path):
+    for name in ('a', 'b'):
+        for copy in (1, 2):
+            img = Image.new('L', (32, 32), 0)
+            img.paste(255, (0, 0, 32, 16) if name == 'a' else (0, 0, 16, 32))
+            img.save(tmp_path / f'{name}{copy}.png')
+
+    finder = ImageFinder()
+    finder.verifier = GroupVerifier()
+    assert len(finder.find_duplicates(tmp_path)) == 2
+
+    # Cancel once the first group has been verified
+    checks = []
+    finder.set_cancel_callback(lambda: checks.append(1) or len(checks) > 1)
+    assert finder.verifier.verify(finder.get_duplicate_groups(), finder) == []
+    assert finder.verifier.stats.groups_checked == 1
+
+
+def test_splits_colours_and_shapes_that_share_an_average_hash(tmp_path):
+    # Red and green have nearly the same grayscale brightness
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'red1.png')
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'red2.png')
+    Image.new('RGB', (32, 32), (0, 128, 0)).save(tmp_path / 'green.png')
+    Image.new('RGB', (64, 16), 'red').save(tmp_path / 'wide.png')
+
+    finder = ImageFinder()
+    finder.verifier = GroupVerifier()
+    groups = finder.find_duplicates(tmp_path)
+
+    assert [sorted(g.paths) for g in groups] == [[tmp_path / 'red1.png', tmp_path / 'red2.png']]
+    assert finder.verifier.stats.images_rejected == 2
+
+
+def test_archive_members_are_read_in_one_pass(tmp_path):
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'a.png')
+    with tarfile.open(tmp_path / 'backup.tar.gz', 'w:gz') as tf:
+        for name in ('copy1.png', 'copy2.png'):
+            tf.add(tmp_path / 'a.png', name)
+
+    finder = ImageFinder()
+    finder.enable_archives(cache_dir=None)
+    finder.verifier = GroupVerifier()
+    finder.archive_reader.read_member = None  # Random access would decompress per member
+    groups = finder.find_duplicates(tmp_path)
+
+    assert len(groups) == 1 and len(groups[0].paths) == 3
+    assert finder.errors == []
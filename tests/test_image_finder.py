@@ -0,0 +1,62 @@
+"""
+Tests for regrouping, choosing and deleting duplicate copies.
+"""
+import zipfile
+
+from PIL import Image
+
+from src.models.image_finder import ImageFinder
+from src.models.keep_policy import KeepPolicy
+
+
+def test_archive_member_is_never_the_keeper_of_loose_files(tmp_path):
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'a.png')
+    (tmp_path / 'b.png').write_bytes((tmp_path / 'a.png').read_bytes())
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'a.tiff')
+    with zipfile.ZipFile(tmp_path / 'backup.zip', 'w') as zf:
+        zf.write(tmp_path / 'a.tiff', 'a.tiff')
+    (tmp_path / 'a.tiff').unlink()
+
+    finder = ImageFinder()
+    finder.enable_archives(cache_dir=None)
+    # TIFF ranks above PNG, so the member would win if it were a candidate
+    finder.keep_policy = KeepPolicy(['format'])
+    groups = finder.find_duplicates(tmp_path)
+    assert len(groups) == 1 and len(groups[0].paths) == 3
+
+    keeper = finder.choose_keeper(groups[0])
+    assert keeper == tmp_path / 'a.png'
+    assert finder.delete_duplicates(groups) == [tmp_path / 'b.png']
+    assert (tmp_path / 'a.png').exists()
+
+
+def test_group_by_regroups_without_rescanning(tmp_path):
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'a.png')
+    (tmp_path / 'b.png').write_bytes((tmp_path / 'a.png').read_bytes())
+    # Same average hash as a solid red image, different pixels
+    Image.new('RGB', (32, 32), 'blue').save(tmp_path / 'c.png')
+
+    finder = ImageFinder()
+    groups = finder.find_duplicates(tmp_path)
+    assert [sorted(g.paths) for g in groups] == [[tmp_path / 'a.png', tmp_path / 'b.png', tmp_path / 'c.png']]
+    assert finder.signatures == {}
+
+    exact = finder.group_by('pixel_digest')
+    assert [sorted(g.paths) for g in exact] == [[tmp_path / 'a.png', tmp_path / 'b.png']]
+    assert len(finder.signatures) == 3
+    assert finder.group_by('average_hash') == groups
+
+
+def test_collected_signatures_regroup_without_decoding_again(tmp_path):
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'a.png')
+    (tmp_path / 'b.png').write_bytes((tmp_path / 'a.png').read_bytes())
+    Image.new('RGB', (32, 32), 'blue').save(tmp_path / 'c.png')
+
+    finder = ImageFinder()
+    finder.collect_signatures = True
+    groups = finder.find_duplicates(tmp_path)
+    assert len(groups[0].paths) == 3 and len(finder.signatures) == 3
+
+    finder._open_image = None  # Any further decode would fail
+    exact = finder.group_by('pixel_digest')
+    assert [sorted(g.paths) for g in exact] == [[tmp_path / 'a.png', tmp_path / 'b.png']]
@@ -0,0 +1,70 @@
+"""
+Tests for disk-layout-aware read ordering and read-ahead.
+"""
+import os
+import errno
+
+import pytest
+
+from src.models import io_scheduler
+from src.models.io_scheduler import IOScheduler
+
+
+@pytest.fixture
+def fadvise_calls(monkeypatch):
+    """Record (inode, advice) for every posix_fadvise call."""
+    calls = []
+    monkeypatch.setattr(io_scheduler, 'HAS_FADVISE', True)
+    monkeypatch.setattr(os, 'POSIX_FADV_WILLNEED', 3, raising=False)
+    monkeypatch.setattr(os, 'POSIX_FADV_DONTNEED', 4, raising=False)
+    monkeypatch.setattr(os, 'posix_fadvise',
+                        lambda fd, offset, length, advice: calls.append((os.fstat(fd).st_ino, advice)),
+                        raising=False)
+    return calls
+
+
+def make_files(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f'{i:02d}.jpg'
+        path.write_bytes(b'x')
+        files.append(path)
+    return files
+
+
+class UnsupportedFiemap:
+    calls = 0
+
+    def ioctl(self, fd, request, arg):
+        self.calls += 1
+        raise OSError(errno.EOPNOTSUPP, os.strerror(errno.EOPNOTSUPP))
+
+
+def test_schedule_falls_back_to_inode_order(tmp_path, monkeypatch, fadvise_calls):
+    fiemap = UnsupportedFiemap()
+    monkeypatch.setattr(io_scheduler, 'fcntl', fiemap)
+    files = make_files(tmp_path, 6)
+
+    ordered = IOScheduler(use_fiemap=True).schedule(list(reversed(files)))
+
+    assert ordered == sorted(files, key=lambda f: f.stat().st_ino)
+    assert fiemap.calls == 1  # The device is remembered as unsupported
+    assert fadvise_calls == []
+
+
+def test_read_ahead_advises_each_file_once(tmp_path, fadvise_calls):
+    files = make_files(tmp_path, 10)
+    scheduler = IOScheduler(readahead=3, use_fiemap=False)
+    ordered = scheduler.schedule(files)
+
+    for index in range(len(ordered)):
+        scheduler.on_file_start(index)
+    for index in (2, 5):  # Out-of-order starts from parallel readers
+        scheduler.on_file_start(index)
+
+    advised = [ino for ino, advice in fadvise_calls if advice == os.POSIX_FADV_WILLNEED]
+    assert advised == [f.stat().st_ino for f in ordered[1:]]
+    assert scheduler._advised_until == len(ordered)
+
+    scheduler.on_file_done(ordered[0])
+    assert fadvise_calls[-1] == (ordered[0].stat().st_ino, os.POSIX_FADV_DONTNEED)
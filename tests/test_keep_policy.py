@@ -0,0 +1,22 @@
+"""
+Tests for choosing which copy of a duplicate survives.
+"""
+from src.models.keep_policy import KeepPolicy
+
+
+def test_prefix_matches_through_symlinked_folders(tmp_path):
+    (tmp_path / 'photos').mkdir()
+    (tmp_path / 'photos' / 'a.jpg').write_bytes(b'')
+    (tmp_path / 'export').mkdir()
+    (tmp_path / 'export' / 'a.jpg').write_bytes(b'')
+    (tmp_path / 'link').symlink_to(tmp_path / 'photos')
+
+    # Scanned through the symlink, preferred by its real path
+    policy = KeepPolicy(['prefix'], preferred_prefixes=[str(tmp_path / 'photos')])
+    paths = [tmp_path / 'export' / 'a.jpg', tmp_path / 'link' / 'a.jpg']
+    assert policy.choose(paths) == tmp_path / 'link' / 'a.jpg'
+
+    # And the other way round
+    policy = KeepPolicy(['prefix'], preferred_prefixes=[str(tmp_path / 'link')])
+    paths = [tmp_path / 'export' / 'a.jpg', tmp_path / 'photos' / 'a.jpg']
+    assert policy.choose(paths) == tmp_path / 'photos' / 'a.jpg'
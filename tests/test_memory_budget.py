@@ -0,0 +1,96 @@
+"""
+Tests for memory-budgeted decoding.
+"""
+import threading
+
+import pytest
+from PIL import Image
+
+from src.models.image_finder import ImageFinder
+from src.models.memory_budget import MemoryBudget, MemoryBudgetExceeded, estimate_decode_bytes
+
+MB = 1024 * 1024
+
+
+def hold(budget, nbytes, entered, release):
+    with budget.reserve(nbytes):
+        entered.set()
+        release.wait(5)
+
+
+def test_reservations_wait_for_free_budget():
+    budget = MemoryBudget(10)
+    first_entered, first_release = threading.Event(), threading.Event()
+    first = threading.Thread(target=hold, args=(budget, 8, first_entered, first_release))
+    first.start()
+    first_entered.wait(5)
+
+    second_entered, second_release = threading.Event(), threading.Event()
+    second = threading.Thread(target=hold, args=(budget, 4, second_entered, second_release))
+    second.start()
+    assert not second_entered.wait(0.1)  # 8 + 4 would exceed the budget
+    first_release.set()
+    assert second_entered.wait(5)
+    assert budget.in_use == 4
+    second_release.set()
+    first.join()
+    second.join()
+    assert budget.peak == 8
+
+
+def test_oversized_image_decodes_alone():
+    budget = MemoryBudget(10)
+    big_entered, big_release = threading.Event(), threading.Event()
+    big = threading.Thread(target=hold, args=(budget, 50, big_entered, big_release))
+    big.start()
+    big_entered.wait(5)
+
+    small_entered, small_release = threading.Event(), threading.Event()
+    small = threading.Thread(target=hold, args=(budget, 1, small_entered, small_release))
+    small.start()
+    assert not small_entered.wait(0.1)  # Blocked by the exclusive slot
+    big_release.set()
+    assert small_entered.wait(5)
+    small_release.set()
+    big.join()
+    small.join()
+    assert budget.in_use == 0
+
+
+def test_hard_limit_refuses_and_no_limit_only_caps():
+    with pytest.raises(MemoryBudgetExceeded):
+        with MemoryBudget(100, max_image_bytes=10).reserve(11):
+            pass
+    budget = MemoryBudget(None, max_image_bytes=10)
+    with budget.reserve(10), budget.reserve(10):
+        assert budget.in_use == 0  # No shared limit to account against
+    with pytest.raises(MemoryBudgetExceeded):
+        with budget.reserve(11):
+            pass
+
+
+def test_large_jpegs_are_hashed_at_reduced_scale(tmp_path):
+    Image.new('RGB', (2048, 2048), 'red').save(tmp_path / 'big.jpg')
+    Image.new('RGB', (2048, 2048), 'red').save(tmp_path / 'big.png')
+    finder = ImageFinder()
+    finder.memory_budget = MemoryBudget(64 * MB, large_image_bytes=1 * MB)
+
+    assert finder.compute_image_hash(tmp_path / 'big.jpg') is not None
+    assert finder.memory_budget.peak < 1 * MB  # DCT-scaled decode
+    assert finder.compute_image_hash(tmp_path / 'big.png') is not None
+    assert finder.compute_image_signature(tmp_path / 'big.jpg') is not None  # Exact, never reduced
+    assert finder.degraded_images == [tmp_path / 'big.jpg']
+
+
+def test_images_over_the_hard_limit_are_skipped(tmp_path):
+    Image.new('RGB', (1024, 1024), 'red').save(tmp_path / 'big.png')
+    Image.new('RGB', (16, 16), 'red').save(tmp_path / 'small.png')
+    with Image.open(tmp_path / 'big.png') as img:
+        assert estimate_decode_bytes(img) > 1 * MB
+    finder = ImageFinder()
+    finder.memory_budget = MemoryBudget(None, max_image_bytes=1 * MB)
+
+    finder.find_duplicates(tmp_path)
+    assert finder.skipped_images == [tmp_path / 'big.png']
+    assert list(finder._path_hashes) == [tmp_path / 'small.png']
+    assert any('big.png' in error for error in finder.errors)
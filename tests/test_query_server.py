@@ -0,0 +1,77 @@
+"""
+Tests for resolving query server lookups.
+"""
+import socket
+
+import pytest
+from PIL import Image
+
+from src.models.image_finder import ImageFinder
+from src.controllers.query_server import QueryServer
+
+
+def make_server(tmp_path, match_key):
+    Image.new('RGB', (32, 32), 'red').save(tmp_path / 'a.png')
+    finder = ImageFinder()
+    finder.set_match_key(match_key)
+    server = QueryServer(finder)
+    server.load(tmp_path)
+    return server
+
+
+def test_lookup_uses_the_index_match_key(tmp_path):
+    server = make_server(tmp_path, 'pixel_digest')
+    status, payload = server.handle_lookup({}, (tmp_path / 'a.png').read_bytes())
+
+    assert status == 200
+    assert payload['hash'] == server.finder.signatures[tmp_path / 'a.png'].pixel_digest
+    assert payload['matches'] == [{'path': str(tmp_path / 'a.png'), 'hash': payload['hash'], 'distance': 0}]
+
+
+def test_lookup_does_not_touch_finder_state(tmp_path):
+    server = make_server(tmp_path, 'difference_hash')
+    status, _ = server.handle_lookup({'path': [str(tmp_path / 'a.png')]}, None)
+    assert status == 200
+    assert list(server.finder.signatures) == [tmp_path / 'a.png']
+
+    status, payload = server.handle_lookup({}, b'not an image')
+    assert status == 422
+    assert payload['error'].startswith('Error processing image data')
+    assert server.finder.errors == []
+
+
+def test_socket_path_refuses_to_replace_regular_file(tmp_path):
+    target = tmp_path / 'query.sock'
+    target.write_text('keep me')
+    server = QueryServer(ImageFinder(), socket_path=target)
+
+    with pytest.raises(FileExistsError):
+        server.start()
+    assert target.read_text() == 'keep me'
+
+
+def test_socket_path_replaces_stale_socket(tmp_path):
+    target = tmp_path / 'query.sock'
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(str(target))
+    stale.close()
+    server = QueryServer(ImageFinder(), socket_path=target)
+
+    server.start()
+    server._httpd.server_close()
+    assert target.exists()
+
+
+@pytest.mark.parametrize('hash_val', ['-1', '0x1f', '1' * 40, '', 'xyz'])
+def test_malformed_hash_is_a_bad_request(tmp_path, hash_val):
+    server = make_server(tmp_path, 'average_hash')
+    status, payload = server.handle_lookup({'hash': [hash_val], 'radius': ['2']}, None)
+    assert status == 400
+
+
+def test_short_hash_matches_the_padded_index_hash(tmp_path):
+    server = make_server(tmp_path, 'average_hash')
+    assert list(server.finder.image_hashes) == ['0000000000000000']  # Solid image
+    status, payload = server.handle_lookup({'hash': ['0']}, None)
+    assert status == 200
+    assert payload['hash'] == '0000000000000000' and payload['found']
@@ -0,0 +1,57 @@
+"""
+Tests for the parallel scan engine and its worker autotuner.
+"""
+import pytest
+
+from src.models.scan_engine import ScanEngine, WorkerAutotuner
+
+
+def make_tuner(max_decoders=4, decoders=2):
+    tuner = WorkerAutotuner(max_readers=8, max_decoders=max_decoders, readers=2, decoders=decoders)
+    # Equal read and decode time per file, so readers track decoders 1:1
+    tuner._read_time = tuner._decode_time = 1.0
+    tuner._samples = 1
+    return tuner
+
+
+def test_grows_decoders_while_throughput_improves():
+    tuner = make_tuner()
+    tuner._adjust(100)
+    assert tuner.decoders == 3
+    tuner._adjust(120)
+    assert tuner.decoders == 4
+    tuner._adjust(130)
+    assert tuner.decoders == 4  # Capped at max_decoders
+
+
+def test_reverts_a_harmful_step_only_once():
+    tuner = make_tuner()
+    decoders = []
+    for throughput in (100, 120, 110, 110, 110):
+        tuner._adjust(throughput)
+        decoders.append(tuner.decoders)
+    assert decoders == [3, 4, 3, 3, 3]
+
+
+def test_never_drops_below_one_decoder():
+    tuner = make_tuner(decoders=1)
+    tuner._adjust(100)
+    assert tuner.decoders == 2
+    for throughput in (10, 5, 1, 1):
+        tuner._adjust(throughput)
+        assert tuner.decoders >= 1
+    assert tuner.readers >= 1
+
+
+def test_readers_follow_read_decode_ratio():
+    tuner = make_tuner(max_decoders=2, decoders=2)
+    tuner._read_time, tuner._decode_time = 4.0, 1.0  # Slow storage
+    tuner._adjust(100)
+    assert tuner.readers == 8  # 2 decoders * 4x read time, capped at max_readers
+
+
+@pytest.mark.parametrize('workers', [(-1, 2), (2, -1), (0, None)])
+def test_engine_rejects_worker_counts_below_one(workers):
+    readers, decoders = workers
+    with pytest.raises(ValueError):
+        ScanEngine(None, readers=readers, decoders=decoders, autotune=False)
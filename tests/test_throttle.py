@@ -0,0 +1,36 @@
+"""
+Tests for background scan limits.
+"""
+import pytest
+
+from src.models import throttle as throttle_module
+from src.models.throttle import ScanThrottle
+
+
+@pytest.mark.parametrize('limits', [(-5, None), (None, -1), (float('nan'), None)])
+def test_rejects_limits_that_never_refill(limits):
+    with pytest.raises(ValueError):
+        ScanThrottle(*limits)
+    throttle = ScanThrottle(1024, 10)
+    with pytest.raises(ValueError):
+        throttle.set_limits(*limits)
+    assert (throttle.bytes_per_second, throttle.files_per_second) == (1024, 10)
+
+
+def test_zero_removes_a_limit():
+    throttle = ScanThrottle(1024, 10)
+    throttle.set_limits(0, 0)
+    assert throttle.bytes_per_second is None and throttle.files_per_second is None
+    assert throttle.acquire(10 ** 9)
+
+
+
+def test_process_niceness_is_lowered_once_outside_linux(monkeypatch):
+    calls = []
+    monkeypatch.setattr(throttle_module.sys, 'platform', 'darwin')
+    monkeypatch.setattr(throttle_module, '_process_niced', False)
+    monkeypatch.setattr(throttle_module.os, 'nice', calls.append, raising=False)
+
+    for _ in range(3):
+        assert throttle_module.lower_thread_priority() is None
+    assert calls == [10]